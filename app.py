@@ -1,10 +1,14 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Depends
+from fastapi.responses import StreamingResponse, JSONResponse
+from typing import List, Optional
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 from pydantic import BaseModel
 from fastapi import HTTPException
 import os
 from dotenv import load_dotenv
+from starlette.formparsers import MultiPartParser
 
 load_dotenv()
 
@@ -15,6 +19,69 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 app = FastAPI()
 
+# Maximum accepted size of an uploaded image
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_READ_CHUNK_BYTES = 1024 * 1024
+# Maximum accepted size of a zip archive uploaded to the batch endpoints
+MAX_BATCH_ARCHIVE_BYTES = int(os.getenv("MAX_BATCH_ARCHIVE_BYTES", str(200 * 1024 * 1024)))
+# Maximum accepted size of a whole batch request (images and archive together)
+MAX_BATCH_REQUEST_BYTES = int(os.getenv("MAX_BATCH_REQUEST_BYTES", str(MAX_BATCH_ARCHIVE_BYTES)))
+
+# Allowance for multipart boundaries and part headers on top of the file size limits
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+BATCH_PATH_PREFIX = "/api/demo_backend_v2/batch/"
+
+# Starlette spools uploaded files to a temporary file on disk past 1 MB; keep any
+# upload we accept in memory (only batch archives above this size are spooled)
+MultiPartParser.max_file_size = MAX_UPLOAD_BYTES
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject oversized request bodies before Starlette parses (and spools) them.
+    Requests whose Content-Length exceeds the limit get 413 straight away; bodies
+    without a Content-Length (chunked) are counted as they stream in and aborted
+    with 413 once they pass the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _limit_for(path: str) -> int:
+        if path.startswith(BATCH_PATH_PREFIX):
+            return MAX_BATCH_REQUEST_BYTES + MULTIPART_OVERHEAD_BYTES
+        return MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        limit = self._limit_for(scope["path"])
+        detail = f"Request too large. Maximum size is {limit} bytes."
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse(status_code=413, content={"detail": detail})
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI re-raises HTTPExceptions raised while reading the body
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+# Added before CORS so CORSMiddleware stays outermost and 413 responses carry CORS headers
+app.add_middleware(RequestSizeLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -23,8 +90,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+async def read_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    """
+    Read an uploaded file into memory in chunks, rejecting it as soon as it exceeds max_bytes.
+    The request as a whole is already capped by RequestSizeLimitMiddleware; this check
+    applies the per-file limit (e.g. to each image of a batch).
+    """
+    buffer = bytearray()
+    while True:
+        chunk = await upload.read(UPLOAD_READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        buffer.extend(chunk)
+        if len(buffer) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"File too large. Maximum size is {max_bytes} bytes.")
+    return bytes(buffer)
 
 from slc.Grain_Detector import analyze_rice_image
 from slc.Quality_Analyzer import analyze_grain_quality
@@ -34,6 +115,16 @@ from slc.invoice import extract_invoice_entities
 from slc.number_plate import extract_number_plate
 from slc.quatity_detection import count_bags
 from slc.weigh_bridge import detect_weigh_bridge_slip
+from slc.Full_Grain_Report import generate_full_grain_report
+from slc.result_cache import get_cache_stats
+from slc.structured_output import get_parse_stats
+from slc.batch import extract_zip_images, stream_batch_ndjson, SLC_BATCH_MAX_IMAGES
+from auth import get_current_user_async, close_http_session
+
+@app.on_event("shutdown")
+async def close_auth_http_session():
+    # Release the pooled aiohttp session used for JWKS refreshes
+    await close_http_session()
 
 class GrainAnalysisResponse(BaseModel):
     result: dict 
@@ -53,24 +144,16 @@ async def analyze_rice_grains_api(
     if not image.filename:
         raise HTTPException(status_code=400, detail="Invalid file name.")
 
-    # Save uploaded image temporarily
-    file_path = os.path.join(UPLOAD_FOLDER, image.filename)
-    with open(file_path, "wb") as f:
-        f.write(await image.read())
+    # Read the uploaded image into memory
+    image_bytes = await read_upload(image)
 
     try:
         # Call the rice grain analysis function
-        analysis_result = analyze_rice_image(file_path)
-
-        # Clean up the temporary file
-        os.remove(file_path)
+        analysis_result = await analyze_rice_image(image_bytes)
 
         return GrainAnalysisResponse(result=analysis_result)
 
     except Exception as e:
-        # Clean up the temporary file in case of error
-        if os.path.exists(file_path):
-            os.remove(file_path)
         raise HTTPException(status_code=500, detail=f"Error analyzing rice grains: {str(e)}")
 
 # Grain Quality Analyzer setup
@@ -94,18 +177,13 @@ async def analyze_grain_quality_api(
     if not image.filename:
         raise HTTPException(status_code=400, detail="Invalid file name.")
 
-    file_path = os.path.join(UPLOAD_FOLDER, image.filename)
-    with open(file_path, "wb") as f:
-        f.write(await image.read())
+    image_bytes = await read_upload(image)
 
     try:
-        analysis_result = analyze_grain_quality(file_path)
-        os.remove(file_path)
+        analysis_result = await analyze_grain_quality(image_bytes)
         return GrainQualityResponse(result=analysis_result)
 
     except Exception as e:
-        if os.path.exists(file_path):
-            os.remove(file_path)
         raise HTTPException(status_code=500, detail=f"Error analyzing grain quality: {str(e)}")
 # Rice Variety Identifier setup
 
@@ -128,18 +206,13 @@ async def identify_rice_variety_api(
     if not image.filename:
         raise HTTPException(status_code=400, detail="Invalid file name.")
 
-    file_path = os.path.join(UPLOAD_FOLDER, image.filename)
-    with open(file_path, "wb") as f:
-        f.write(await image.read())
+    image_bytes = await read_upload(image)
 
     try:
-        analysis_result = identify_rice_variety(file_path)
-        os.remove(file_path)
+        analysis_result = await identify_rice_variety(image_bytes)
         return RiceVarietyResponse(result=analysis_result)
 
     except Exception as e:
-        if os.path.exists(file_path):
-            os.remove(file_path)
         raise HTTPException(status_code=500, detail=f"Error identifying rice variety: {str(e)}")
 
 # Commodity Classifier setup
@@ -163,29 +236,74 @@ async def classify_commodity_api(
     if not image.filename:
         raise HTTPException(status_code=400, detail="Invalid file name.")
 
-    file_path = os.path.join(UPLOAD_FOLDER, image.filename)
-    with open(file_path, "wb") as f:
-        f.write(await image.read())
+    image_bytes = await read_upload(image)
 
     try:
-        analysis_result = classify_commodity(file_path)
-        os.remove(file_path)
+        analysis_result = await classify_commodity(image_bytes)
         return CommodityClassifierResponse(result=analysis_result)
 
     except Exception as e:
-        if os.path.exists(file_path):
-            os.remove(file_path)
         raise HTTPException(status_code=500, detail=f"Error classifying commodity: {str(e)}")
 
 
+# Full Grain Report setup
+
+class FullGrainReportResponse(BaseModel):
+    grain_analysis: dict
+    quality_analysis: dict
+    variety_identification: dict
+    commodity_classification: dict
+
+@app.post("/api/demo_backend_v2/full_grain_report")
+async def full_grain_report_api(
+    image: UploadFile = File(..., description="Upload a grain sample image for a full intake report")
+):
+    """
+    API endpoint that runs grain analysis, quality analysis, variety identification and
+    commodity classification on one image with a single Gemini call.
+
+    Returns one section per analysis, each in the same shape as the `result` of
+    /analyze_rice_grains, /analyze_grain_quality, /identify_rice_variety and /classify_commodity.
+    """
+    if not image.filename:
+        raise HTTPException(status_code=400, detail="Invalid file name.")
+
+    image_bytes = await read_upload(image)
+
+    try:
+        report = await generate_full_grain_report(image_bytes)
+        return FullGrainReportResponse(**report)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating grain report: {str(e)}")
+
+
+@app.get("/api/demo_backend_v2/cache_stats")
+async def slc_cache_stats_api(user_id: str = Depends(get_current_user_async)):
+    """
+    Hit/miss counters and hit ratio of the slc image analysis result cache.
+    Requires a valid Clerk bearer token.
+    """
+    return get_cache_stats()
+
+
+@app.get("/api/demo_backend_v2/parse_stats")
+async def slc_parse_stats_api(user_id: str = Depends(get_current_user_async)):
+    """
+    Per-analyzer structured output counters: requests, parse failures, repair retries and failure rate.
+    Requires a valid Clerk bearer token.
+    """
+    return get_parse_stats()
+
+
 @app.post("/invoice_extraction/")
 async def invoice_extraction_endpoint(file: UploadFile = File(...)):
     """
     Endpoint for invoice entity extraction.
     """
+    image_bytes = await read_upload(file)
     try:
-        image_bytes = await file.read()
-        result = extract_invoice_entities(image_bytes)
+        result = await extract_invoice_entities(image_bytes)
         return {"result": result}
     except Exception as e:
         return {"error": f"Error processing the invoice: {str(e)}"}
@@ -195,9 +313,9 @@ async def number_plate_extraction_endpoint(file: UploadFile = File(...)):
     """
     Endpoint for number plate extraction.
     """
+    image_bytes = await read_upload(file)
     try:
-        image_bytes = await file.read()
-        result = extract_number_plate(image_bytes)
+        result = await extract_number_plate(image_bytes)
         return {"result": result}
     except Exception as e:
         return {"error": f"Error processing the number plate image: {str(e)}"}
@@ -207,9 +325,9 @@ async def rice_bags_detection_endpoint(file: UploadFile = File(...)):
     """
     Endpoint for counting rice bags in an image.
     """
+    image_bytes = await read_upload(file)
     try:
-        image_bytes = await file.read()
-        result = count_bags(image_bytes)
+        result = await count_bags(image_bytes)
         return {"result": result}
     except Exception as e:
         return {"error": f"Error processing the rice bag image: {str(e)}"}
@@ -219,9 +337,63 @@ async def weigh_bridge_slip_detection_endpoint(file: UploadFile = File(...)):
     """
     Endpoint for extracting data from a weighbridge slip.
     """
+    image_bytes = await read_upload(file)
     try:
-        image_bytes = await file.read()
-        result = detect_weigh_bridge_slip(image_bytes)
+        result = await detect_weigh_bridge_slip(image_bytes)
         return {"result": result}
     except Exception as e:
         return {"error": f"Error processing the weighbridge slip: {str(e)}"}
+
+
+# Batch analysis setup
+
+# Analyzers available to the batch endpoint, keyed by the name of their single-image endpoint
+BATCH_ANALYZERS = {
+    "analyze_rice_grains": analyze_rice_image,
+    "analyze_grain_quality": analyze_grain_quality,
+    "identify_rice_variety": identify_rice_variety,
+    "classify_commodity": classify_commodity,
+    "full_grain_report": generate_full_grain_report,
+    "invoice_extraction": extract_invoice_entities,
+    "number_plate_extraction": extract_number_plate,
+    "rice_bags_detection": count_bags,
+    "weigh_bridge_slip_detection": detect_weigh_bridge_slip,
+}
+
+@app.post("/api/demo_backend_v2/batch/{analyzer}")
+async def batch_analysis_api(
+    analyzer: str,
+    images: Optional[List[UploadFile]] = File(None, description="Upload one or more images"),
+    archive: Optional[UploadFile] = File(None, description="Upload a zip archive of images")
+):
+    """
+    API endpoint to run any slc analyzer over many images in one request.
+
+    Images can be sent as multiple `images` parts, a zip `archive`, or both. They are analysed
+    concurrently and results are streamed back as NDJSON, one line per image in completion order:
+    {"index": number, "filename": "name", "result": ...}
+    """
+    analyzer_fn = BATCH_ANALYZERS.get(analyzer)
+    if analyzer_fn is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown analyzer '{analyzer}'. Available: {', '.join(BATCH_ANALYZERS)}"
+        )
+
+    batch = []
+    for image in images or []:
+        batch.append((image.filename, await read_upload(image)))
+
+    if archive is not None:
+        archive_bytes = await read_upload(archive, MAX_BATCH_ARCHIVE_BYTES)
+        try:
+            batch.extend(await asyncio.to_thread(extract_zip_images, archive_bytes, MAX_UPLOAD_BYTES))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid archive: {str(e)}")
+
+    if not batch:
+        raise HTTPException(status_code=400, detail="No images provided.")
+    if len(batch) > SLC_BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=400, detail=f"Too many images. Maximum is {SLC_BATCH_MAX_IMAGES} per batch.")
+
+    return StreamingResponse(stream_batch_ndjson(analyzer_fn, batch), media_type="application/x-ndjson")
@@ -1,4 +1,11 @@
 import os
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
 import requests
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -13,44 +20,257 @@ load_dotenv()
 clerk_issuer = os.getenv("CLERK_ISSUER")
 clerk_jwks_url = os.getenv("CLERK_JWKS_URL")
 
+# JWKS cache settings
+JWKS_CACHE_TTL_SECONDS = int(os.getenv("JWKS_CACHE_TTL_SECONDS", "3600"))  # Keys are considered fresh for 1 hour
+JWKS_REFRESH_AHEAD_SECONDS = int(os.getenv("JWKS_REFRESH_AHEAD_SECONDS", "300"))  # Refresh in background 5 mins before expiry
+JWKS_MIN_REFETCH_INTERVAL_SECONDS = int(os.getenv("JWKS_MIN_REFETCH_INTERVAL_SECONDS", "30"))  # Rate limit for unknown 'kid' refetches
+JWKS_RETRY_AFTER_FAILURE_SECONDS = int(os.getenv("JWKS_RETRY_AFTER_FAILURE_SECONDS", "30"))  # Back off after a failed fetch
+JWKS_FETCH_TIMEOUT_SECONDS = float(os.getenv("JWKS_FETCH_TIMEOUT_SECONDS", "5"))
+
+# Verified token cache settings
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+
+# Clerk user IDs ('sub' claims) allowed to use admin endpoints, comma-separated.
+# Empty means nobody is an admin.
+ADMIN_USER_IDS = {user_id.strip() for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()}
+
+# Async auth settings
+JWKS_HTTP_POOL_SIZE = int(os.getenv("JWKS_HTTP_POOL_SIZE", "10"))
+TOKEN_VERIFY_WORKERS = int(os.getenv("TOKEN_VERIFY_WORKERS", "4"))
+
 # Setup for Bearer Token Authentication
 security = HTTPBearer()
 
+# In-process JWKS cache: maps 'kid' to a pre-built PEM public key
+_jwks_keys = {}
+_jwks_fetched_at = 0.0
+_jwks_last_fetch_attempt = 0.0
+_jwks_retry_after = 0.0  # No fetch is attempted before this time after a failure
+_jwks_refresh_in_progress = False
+_jwks_lock = threading.Lock()
+_jwks_refresh_lock = threading.Lock()  # Single-flight for inline (blocking) refreshes
+
+jwks_cache_stats = {
+    "hits": 0,
+    "misses": 0,
+    "refreshes": 0,
+    "background_refreshes": 0,
+    "refresh_failures": 0,
+}
+
+# LRU cache of verified token payloads: maps sha256(token) to (payload, exp)
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+token_cache_stats = {
+    "hits": 0,
+    "misses": 0,
+    "expired": 0,
+    "evictions": 0,
+}
+
+# Shared pooled HTTP session for async JWKS refreshes (created lazily on the running loop)
+_http_session = None
+_jwks_async_lock = None
+_jwks_background_task = None
+
+# Dedicated executor for RSA verification so it does not compete with FastAPI's threadpool
+_verify_executor = ThreadPoolExecutor(max_workers=TOKEN_VERIFY_WORKERS, thread_name_prefix="token-verify")
+
 # Function to get JWKS (JSON Web Key Set) from Clerk
 def get_jwks():
-    response = requests.get(clerk_jwks_url)
+    response = requests.get(clerk_jwks_url, timeout=JWKS_FETCH_TIMEOUT_SECONDS)
     if response.status_code != 200:
         raise HTTPException(status_code=500, detail="Unable to fetch JWKS from Clerk")
     return response.json()
 
+def _build_key_map(jwks):
+    """Convert a JWKS document into a {kid: PEM string} mapping."""
+    keys = {}
+    for key in jwks.get('keys', []):
+        kid = key.get('kid')
+        if not kid:
+            continue
+        try:
+            keys[kid] = jwk.construct(key).to_pem().decode('utf-8')
+        except Exception as e:
+            print(f"Skipping JWKS key {kid}: {e}")
+    return keys
+
+def refresh_jwks():
+    """
+    Fetch the JWKS from Clerk and swap it into the cache.
+    On failure the previously cached keys are kept so a slow or unavailable
+    JWKS endpoint does not take down authentication, and no further fetch is
+    attempted for JWKS_RETRY_AFTER_FAILURE_SECONDS.
+    """
+    global _jwks_last_fetch_attempt
+
+    _jwks_last_fetch_attempt = time.time()
+    try:
+        jwks = get_jwks()
+    except Exception as e:
+        _record_refresh_failure(e)
+        return False
+
+    _store_jwks(jwks)
+    return True
+
+def _record_refresh_failure(error):
+    global _jwks_retry_after
+    _jwks_retry_after = time.time() + JWKS_RETRY_AFTER_FAILURE_SECONDS
+    jwks_cache_stats["refresh_failures"] += 1
+    print(f"JWKS refresh failed: {error}")
+
+def _refresh_jwks_inline():
+    """
+    Blocking refresh used when there are no usable keys. Concurrent callers share
+    one fetch, and nothing is fetched while backing off after a failure.
+    """
+    started_at = time.time()
+    with _jwks_refresh_lock:
+        # Another thread refreshed while we were waiting for the lock
+        if _jwks_fetched_at >= started_at:
+            return True
+        if time.time() < _jwks_retry_after:
+            return False
+        return refresh_jwks()
+
+def _store_jwks(jwks):
+    _store_keys(_build_key_map(jwks))
+
+def _store_keys(keys):
+    global _jwks_keys, _jwks_fetched_at, _jwks_retry_after
+
+    with _jwks_lock:
+        _jwks_keys = keys
+        _jwks_fetched_at = time.time()
+        _jwks_retry_after = 0.0
+    jwks_cache_stats["refreshes"] += 1
+
+def _background_refresh():
+    global _jwks_refresh_in_progress
+    try:
+        refresh_jwks()
+    finally:
+        _jwks_refresh_in_progress = False
+
+def _schedule_background_refresh():
+    """Start a refresh-ahead thread unless one is already running or we are backing off."""
+    global _jwks_refresh_in_progress
+    with _jwks_lock:
+        if _jwks_refresh_in_progress or time.time() < _jwks_retry_after:
+            return
+        _jwks_refresh_in_progress = True
+    jwks_cache_stats["background_refreshes"] += 1
+    threading.Thread(target=_background_refresh, daemon=True).start()
+
 # Function to get the public key for the JWT token (based on 'kid' from token header)
 def get_public_key(kid):
-    jwks = get_jwks()
-    for key in jwks['keys']:
-        if key['kid'] == kid:
-            return jwk.construct(key)
+    """
+    Return the cached PEM public key for the given 'kid'.
+    The JWKS is only fetched inline when the cache is empty. Keys close to or past
+    their TTL are still served while a single background refresh runs, so a slow
+    JWKS endpoint never blocks requests once keys have been loaded. An unknown
+    'kid' triggers a refetch at most once every JWKS_MIN_REFETCH_INTERVAL_SECONDS.
+    """
+    age = time.time() - _jwks_fetched_at
+
+    if not _jwks_keys:
+        # Nothing cached yet - this request has to wait for the fetch
+        _refresh_jwks_inline()
+        if not _jwks_keys:
+            raise HTTPException(status_code=500, detail="Unable to fetch JWKS from Clerk")
+    elif age > JWKS_CACHE_TTL_SECONDS - JWKS_REFRESH_AHEAD_SECONDS:
+        # Refresh-ahead, or stale-while-revalidate once the TTL has passed
+        _schedule_background_refresh()
+
+    public_key = _jwks_keys.get(kid)
+    if public_key:
+        jwks_cache_stats["hits"] += 1
+        return public_key
+
+    jwks_cache_stats["misses"] += 1
+
+    # Unknown 'kid' (e.g. key rotation) - refetch, but rate limited. Requests arriving
+    # while a refetch is in flight wait for it instead of being rejected.
+    if _jwks_refresh_lock.locked() or time.time() - _jwks_last_fetch_attempt >= JWKS_MIN_REFETCH_INTERVAL_SECONDS:
+        _refresh_jwks_inline()
+        public_key = _jwks_keys.get(kid)
+        if public_key:
+            return public_key
+
     raise HTTPException(status_code=401, detail="Invalid token")
 
+def _token_cache_key(token: str):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def _get_cached_payload(key):
+    """Return the cached payload for a token hash, dropping it once the token has expired."""
+    with _token_cache_lock:
+        entry = _token_cache.get(key)
+        if entry is None:
+            token_cache_stats["misses"] += 1
+            return None
+        payload, exp = entry
+        if exp <= time.time():
+            del _token_cache[key]
+            token_cache_stats["expired"] += 1
+            token_cache_stats["misses"] += 1
+            return None
+        _token_cache.move_to_end(key)
+        token_cache_stats["hits"] += 1
+        return payload
+
+def _cache_payload(key, payload):
+    exp = payload.get('exp')
+    # Tokens without an expiry are never cached
+    if not isinstance(exp, (int, float)) or TOKEN_CACHE_MAX_SIZE <= 0:
+        return
+    with _token_cache_lock:
+        _token_cache[key] = (payload, exp)
+        _token_cache.move_to_end(key)
+        while len(_token_cache) > TOKEN_CACHE_MAX_SIZE:
+            _token_cache.popitem(last=False)
+            token_cache_stats["evictions"] += 1
+
+def clear_token_cache():
+    with _token_cache_lock:
+        _token_cache.clear()
+
+def _verify_token(token: str, public_key: str):
+    """Verify the RS256 signature and claims of a token with the given PEM public key."""
+    return jwt.decode(
+        token,
+        public_key,
+        algorithms=['RS256'],
+        audience="your_audience",  # Replace with your audience
+        issuer=clerk_issuer
+    )
+
 # Function to decode the JWT token and verify its validity
 def decode_token(token: str):
+    # Repeat calls with an already verified, unexpired token skip signature verification
+    cache_key = _token_cache_key(token)
+    payload = _get_cached_payload(cache_key)
+    if payload is not None:
+        return payload
+
     try:
         # Get the 'kid' (key id) from the token's unverified header
         headers = jwt.get_unverified_headers(token)
         kid = headers['kid']
-        
-        # Get the public key for that kid
+
+        # Get the cached PEM public key for that kid
         public_key = get_public_key(kid)
-        
+
         # Decode the token using the public key and verify it
-        payload = jwt.decode(
-            token,
-            public_key.to_pem().decode('utf-8'),
-            algorithms=['RS256'],
-            audience="your_audience",  # Replace with your audience
-            issuer=clerk_issuer
-        )
-        
+        payload = _verify_token(token, public_key)
+
+        _cache_payload(cache_key, payload)
         return payload
+    except HTTPException:
+        raise
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
     except Exception as e:
@@ -61,8 +281,150 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     token = credentials.credentials  # Extract Bearer token from the request
     payload = decode_token(token)  # Decode and verify the token
     user_id = payload.get('sub')  # 'sub' is the user ID in the JWT token
-    
+
     if not user_id:
         raise HTTPException(status_code=401, detail="User ID not found in token")
 
     return user_id
+
+
+# ---------------------------------------------------------------------------
+# Async variants for use as dependencies of `async def` FastAPI endpoints.
+# JWKS refreshes go through a shared pooled aiohttp session and RSA
+# verification runs on a dedicated executor, so the event loop never blocks.
+# ---------------------------------------------------------------------------
+
+async def _get_http_session():
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=JWKS_HTTP_POOL_SIZE),
+            timeout=aiohttp.ClientTimeout(total=JWKS_FETCH_TIMEOUT_SECONDS),
+        )
+    return _http_session
+
+async def close_http_session():
+    """Close the shared aiohttp session. Call on application shutdown."""
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+async def get_jwks_async():
+    session = await _get_http_session()
+    async with session.get(clerk_jwks_url) as response:
+        if response.status != 200:
+            raise HTTPException(status_code=500, detail="Unable to fetch JWKS from Clerk")
+        return await response.json()
+
+async def refresh_jwks_async():
+    """
+    Async counterpart of refresh_jwks. Concurrent callers share a single
+    in-flight fetch instead of each hitting the JWKS endpoint.
+    """
+    global _jwks_async_lock, _jwks_last_fetch_attempt
+
+    if _jwks_async_lock is None:
+        _jwks_async_lock = asyncio.Lock()
+
+    started_at = time.time()
+    async with _jwks_async_lock:
+        # Another coroutine refreshed while we were waiting for the lock
+        if _jwks_fetched_at >= started_at:
+            return True
+        if time.time() < _jwks_retry_after:
+            return False
+
+        _jwks_last_fetch_attempt = time.time()
+        try:
+            jwks = await get_jwks_async()
+        except Exception as e:
+            _record_refresh_failure(e)
+            return False
+
+        # Building PEM keys is CPU work - keep it off the event loop
+        keys = await asyncio.to_thread(_build_key_map, jwks)
+        _store_keys(keys)
+        return True
+
+def _schedule_background_refresh_async():
+    """Start a refresh-ahead task on the running loop unless one is already pending."""
+    global _jwks_background_task
+    if _jwks_background_task is not None and not _jwks_background_task.done():
+        return
+    if time.time() < _jwks_retry_after:
+        return
+    jwks_cache_stats["background_refreshes"] += 1
+    _jwks_background_task = asyncio.create_task(refresh_jwks_async())
+
+async def get_public_key_async(kid):
+    """Async counterpart of get_public_key with the same caching rules."""
+    age = time.time() - _jwks_fetched_at
+
+    if not _jwks_keys:
+        await refresh_jwks_async()
+        if not _jwks_keys:
+            raise HTTPException(status_code=500, detail="Unable to fetch JWKS from Clerk")
+    elif age > JWKS_CACHE_TTL_SECONDS - JWKS_REFRESH_AHEAD_SECONDS:
+        _schedule_background_refresh_async()
+
+    public_key = _jwks_keys.get(kid)
+    if public_key:
+        jwks_cache_stats["hits"] += 1
+        return public_key
+
+    jwks_cache_stats["misses"] += 1
+
+    # Unknown 'kid' (e.g. key rotation) - refetch, but rate limited. Requests arriving
+    # while a refetch is in flight wait for it instead of being rejected.
+    refresh_in_flight = _jwks_async_lock is not None and _jwks_async_lock.locked()
+    if refresh_in_flight or time.time() - _jwks_last_fetch_attempt >= JWKS_MIN_REFETCH_INTERVAL_SECONDS:
+        await refresh_jwks_async()
+        public_key = _jwks_keys.get(kid)
+        if public_key:
+            return public_key
+
+    raise HTTPException(status_code=401, detail="Invalid token")
+
+async def decode_token_async(token: str):
+    cache_key = _token_cache_key(token)
+    payload = _get_cached_payload(cache_key)
+    if payload is not None:
+        return payload
+
+    try:
+        headers = jwt.get_unverified_headers(token)
+        kid = headers['kid']
+
+        public_key = await get_public_key_async(kid)
+
+        # Offload the CPU-heavy signature check to the verification executor
+        loop = asyncio.get_running_loop()
+        payload = await loop.run_in_executor(_verify_executor, _verify_token, token, public_key)
+
+        _cache_payload(cache_key, payload)
+        return payload
+    except HTTPException:
+        raise
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Async dependency to handle Bearer token verification in async routes
+async def get_current_user_async(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    token = credentials.credentials
+    payload = await decode_token_async(token)
+    user_id = payload.get('sub')
+
+    if not user_id:
+        raise HTTPException(status_code=401, detail="User ID not found in token")
+
+    return user_id
+
+# Async dependency for admin-only routes: a valid token whose user is in ADMIN_USER_IDS
+async def get_admin_user_async(user_id: str = Depends(get_current_user_async)):
+    if user_id not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return user_id
@@ -0,0 +1,109 @@
+"""
+Load test for the auth dependencies: p50/p99 latency of a mixed workload of
+authenticated and unauthenticated requests, once with the sync get_current_user
+dependency and once with get_current_user_async.
+
+The token cache is disabled so every authenticated request pays for RS256
+verification, and JWKS keys come from a local stub server.
+
+    python benchmarks/auth_load_test.py [--requests 2000] [--concurrency 64] [--auth-share 0.5]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from jwks_stub_server import generate_signing_key, serve_jwks
+from token_cache_benchmark import ISSUER, KID, make_tokens
+
+import auth
+
+
+def build_app():
+    app = FastAPI()
+
+    @app.get("/public")
+    async def public():
+        return {"ok": True}
+
+    @app.get("/sync_auth")
+    async def sync_auth(user_id: str = Depends(auth.get_current_user)):
+        return {"user_id": user_id}
+
+    @app.get("/async_auth")
+    async def async_auth(user_id: str = Depends(auth.get_current_user_async)):
+        return {"user_id": user_id}
+
+    return app
+
+
+async def run_workload(app, auth_path, tokens, requests, concurrency, auth_share):
+    """Return {"auth": [latencies], "public": [latencies]} in seconds."""
+    latencies = {"auth": [], "public": []}
+    rng = random.Random(0)
+    plan = ["auth" if rng.random() < auth_share else "public" for _ in range(requests)]
+    queue = asyncio.Queue()
+    for kind in plan:
+        queue.put_nowait(kind)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                kind = queue.get_nowait()
+                if kind == "auth":
+                    token = rng.choice(tokens)
+                    request = client.get(auth_path, headers={"Authorization": f"Bearer {token}"})
+                else:
+                    request = client.get("/public")
+                start = time.perf_counter()
+                response = await request
+                latencies[kind].append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(label, latencies):
+    for kind, values in latencies.items():
+        if values:
+            print(f"{label:<8} {kind:<7} n={len(values):<6} "
+                  f"p50 {percentile(values, 0.50) * 1000:>8.2f} ms   "
+                  f"p99 {percentile(values, 0.99) * 1000:>8.2f} ms")
+
+
+async def main(args):
+    private_pem, public_jwk = generate_signing_key(KID)
+    auth.clerk_issuer = ISSUER
+    auth.TOKEN_CACHE_MAX_SIZE = 0
+    tokens = make_tokens(private_pem, 100)
+    app = build_app()
+
+    with serve_jwks({"keys": [public_jwk]}) as (url, _):
+        auth.clerk_jwks_url = url
+        try:
+            for label, path in (("sync", "/sync_auth"), ("async", "/async_auth")):
+                latencies = await run_workload(
+                    app, path, tokens, args.requests, args.concurrency, args.auth_share
+                )
+                report(label, latencies)
+        finally:
+            await auth.close_http_session()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--auth-share", type=float, default=0.5,
+                        help="fraction of requests that carry a bearer token")
+    asyncio.run(main(parser.parse_args()))
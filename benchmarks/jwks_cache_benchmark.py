@@ -0,0 +1,88 @@
+"""
+JWKS cache benchmark against a local stub JWKS server.
+
+Compares the per-request fetch that get_public_key used to do (HTTP round trip and
+PEM conversion on every call) with the cached lookup, and checks that a slow JWKS
+endpoint does not slow down requests once keys are cached.
+
+    python benchmarks/jwks_cache_benchmark.py [--requests 2000] [--slow-delay 0.25]
+"""
+import argparse
+import time
+
+from jwks_stub_server import generate_signing_key, serve_jwks
+
+import auth
+
+KID = "bench_kid"
+
+
+def reset_jwks_cache():
+    auth._jwks_keys = {}
+    auth._jwks_fetched_at = 0.0
+    auth._jwks_last_fetch_attempt = 0.0
+    auth._jwks_retry_after = 0.0
+    for name in auth.jwks_cache_stats:
+        auth.jwks_cache_stats[name] = 0
+
+
+def timed_calls(fn, count):
+    """Call fn count times; return per-call latencies in seconds."""
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(label, latencies):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<34} {len(latencies) / total:>12.0f} calls/s   "
+          f"mean {total / len(latencies) * 1e6:>9.1f} us   "
+          f"p99 {p99 * 1e6:>9.1f} us   max {latencies[-1] * 1e6:>9.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--slow-delay", type=float, default=0.25,
+                        help="response delay of the slow JWKS endpoint, in seconds")
+    args = parser.parse_args()
+
+    _, public_jwk = generate_signing_key(KID)
+    jwks = {"keys": [public_jwk]}
+
+    with serve_jwks(jwks) as (url, stub):
+        auth.clerk_jwks_url = url
+
+        # Before: every request fetched the JWKS and rebuilt the PEM key
+        uncached_count = max(1, args.requests // 10)
+        report("uncached (fetch per request)",
+               timed_calls(lambda: auth._build_key_map(auth.get_jwks())[KID], uncached_count))
+
+        reset_jwks_cache()
+        stub.requests = 0
+        report("cached get_public_key", timed_calls(lambda: auth.get_public_key(KID), args.requests))
+        print(f"  JWKS requests: {stub.requests}, stats: {auth.jwks_cache_stats}")
+
+    with serve_jwks(jwks, delay=args.slow_delay) as (url, stub):
+        auth.clerk_jwks_url = url
+
+        # Keys past their TTL: served stale while one background refresh waits on the endpoint
+        reset_jwks_cache()
+        auth._store_jwks(jwks)
+        auth._jwks_fetched_at -= auth.JWKS_CACHE_TTL_SECONDS + 1
+        report(f"stale keys, endpoint +{args.slow_delay * 1000:.0f} ms",
+               timed_calls(lambda: auth.get_public_key(KID), args.requests))
+
+        deadline = time.time() + args.slow_delay + auth.JWKS_FETCH_TIMEOUT_SECONDS
+        while auth._jwks_refresh_in_progress and time.time() < deadline:
+            time.sleep(0.01)
+        print(f"  JWKS requests: {stub.requests}, stats: {auth.jwks_cache_stats}")
+
+
+if __name__ == "__main__":
+    main()
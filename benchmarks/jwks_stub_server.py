@@ -0,0 +1,77 @@
+"""
+Local stand-in for Clerk's JWKS endpoint, shared by the auth benchmarks.
+Needs python-jose with the cryptography backend (as auth.py does).
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk
+
+# The benchmarks import auth.py from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def generate_signing_key(kid):
+    """Return (private PEM, public JWK dict) for a fresh RS256 key."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode("utf-8")
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    public_jwk = jwk.construct(public_pem, "RS256").to_dict()
+    public_jwk.update(kid=kid, use="sig")
+    return private_pem, public_jwk
+
+
+class JWKSStubServer:
+    """Serves a fixed JWKS document, optionally after a delay, and counts requests."""
+
+    def __init__(self, jwks, delay=0.0):
+        self.body = json.dumps(jwks).encode("utf-8")
+        self.delay = delay
+        self.requests = 0
+
+    def handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                if server.delay:
+                    time.sleep(server.delay)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(server.body)))
+                self.end_headers()
+                self.wfile.write(server.body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+@contextmanager
+def serve_jwks(jwks, delay=0.0):
+    """Run a JWKS stub server on a free local port; yields (url, stub)."""
+    stub = JWKSStubServer(jwks, delay)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), stub.handler())
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_port}/.well-known/jwks.json", stub
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,69 @@
+"""
+Verified-token cache microbenchmark: decode_token verifications/sec with the cache
+disabled (full RS256 verification on every call) and enabled (repeat tokens are a
+dictionary lookup).
+
+    python benchmarks/token_cache_benchmark.py [--calls 5000] [--sessions 100]
+"""
+import argparse
+import time
+
+from jose import jwt
+
+from jwks_stub_server import generate_signing_key
+
+import auth
+
+KID = "bench_kid"
+ISSUER = "https://clerk.bench.local"
+
+
+def make_tokens(private_pem, count):
+    exp = int(time.time()) + 3600
+    return [
+        jwt.encode(
+            {"sub": f"user_{i}", "aud": "your_audience", "iss": ISSUER, "exp": exp},
+            private_pem,
+            algorithm="RS256",
+            headers={"kid": KID},
+        )
+        for i in range(count)
+    ]
+
+
+def verifications_per_second(tokens, calls, cache_size):
+    auth.TOKEN_CACHE_MAX_SIZE = cache_size
+    auth.clear_token_cache()
+    for name in auth.token_cache_stats:
+        auth.token_cache_stats[name] = 0
+
+    start = time.perf_counter()
+    for i in range(calls):
+        auth.decode_token(tokens[i % len(tokens)])
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--sessions", type=int, default=100,
+                        help="distinct bearer tokens reused round-robin")
+    args = parser.parse_args()
+
+    private_pem, public_jwk = generate_signing_key(KID)
+    auth.clerk_issuer = ISSUER
+    # Keys are preloaded so only verification is measured (see jwks_cache_benchmark.py)
+    auth._store_jwks({"keys": [public_jwk]})
+    tokens = make_tokens(private_pem, args.sessions)
+    default_size = auth.TOKEN_CACHE_MAX_SIZE
+
+    before = verifications_per_second(tokens, args.calls, cache_size=0)
+    print(f"cache disabled   {before:>12.0f} verifications/s")
+
+    after = verifications_per_second(tokens, args.calls, cache_size=default_size)
+    print(f"cache enabled    {after:>12.0f} verifications/s   ({after / before:.0f}x)")
+    print(f"  stats: {auth.token_cache_stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import os
+import time
+import heapq
+import asyncio
+import threading
+
+
+class ExpiryScheduler:
+    """
+    Expires items (e.g. uploaded PDFs) at their TTL instead of sweeping a directory.
+    Items are kept in a min-heap of (expires_at, item_id); the runner sleeps until
+    the earliest expiry (or until an earlier one is scheduled) and passes every due
+    item to `on_expire(item_ids)`, which runs in a worker thread so file and vector
+    removal never blocks the event loop. `on_expire` returns the IDs it failed to
+    expire (or None); those, or all of its items if it raises, are scheduled again
+    after an exponential backoff.
+
+    Optionally, `run` also sweeps a directory every `sweep_interval_seconds` and
+    schedules files nobody called `schedule` for, so uploads saved by code that
+    doesn't know about the scheduler still expire.
+    """
+
+    def __init__(self, name: str, on_expire, retry_delay_seconds: float = 60, max_retry_delay_seconds: float = 3600):
+        self.name = name
+        self.on_expire = on_expire
+        self.retry_delay_seconds = retry_delay_seconds
+        self.max_retry_delay_seconds = max_retry_delay_seconds
+        self._heap = []  # (expires_at, item_id)
+        self._expiries = {}  # item_id -> current expires_at, so rescheduled entries are skipped
+        self._failures = {}  # item_id -> consecutive failed expiry attempts
+        self._lock = threading.Lock()
+        self._loop = None
+        self._wakeup = None
+
+    def schedule(self, item_id: str, ttl_seconds: float = None, expires_at: float = None):
+        """
+        Expire `item_id` after `ttl_seconds` (or at `expires_at`). Rescheduling an
+        item replaces its previous expiry. Safe to call from any thread.
+        """
+        if expires_at is None:
+            expires_at = time.time() + ttl_seconds
+        with self._lock:
+            self._expiries[item_id] = expires_at
+            heapq.heappush(self._heap, (expires_at, item_id))
+            is_next = self._heap[0] == (expires_at, item_id)
+        if is_next:
+            self._wake()
+
+    def cancel(self, item_id: str):
+        with self._lock:
+            self._expiries.pop(item_id, None)
+            self._failures.pop(item_id, None)
+
+    def seed_from_directory(self, directory: str, ttl_seconds: float):
+        """
+        Schedule files in `directory` that aren't scheduled yet by their mtime, so
+        uploads from before a restart (or saved without calling `schedule`) still
+        expire. Returns the number of files added.
+        """
+        added = 0
+        for filename in os.listdir(directory):
+            filepath = os.path.join(directory, filename)
+            with self._lock:
+                scheduled = filename in self._expiries
+            if scheduled or not os.path.isfile(filepath):
+                continue
+            try:
+                expires_at = os.path.getmtime(filepath) + ttl_seconds
+            except FileNotFoundError:
+                continue
+            self.schedule(filename, expires_at=expires_at)
+            added += 1
+        return added
+
+    def _retry_later(self, item_ids):
+        """Reschedule items whose expiry failed, backing off exponentially per item."""
+        now = time.time()
+        with self._lock:
+            for item_id in item_ids:
+                if item_id in self._expiries:
+                    continue  # Rescheduled while on_expire was running
+                failures = self._failures.get(item_id, 0) + 1
+                self._failures[item_id] = failures
+                delay = min(self.retry_delay_seconds * 2 ** (failures - 1), self.max_retry_delay_seconds)
+                self._expiries[item_id] = now + delay
+                heapq.heappush(self._heap, (now + delay, item_id))
+
+    def _expired(self, item_ids):
+        with self._lock:
+            for item_id in item_ids:
+                self._failures.pop(item_id, None)
+
+    def _wake(self):
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            pass  # Loop already closed
+
+    def _pop_due(self, now: float):
+        """Pop due items; returns (item_ids, seconds until the next expiry or None)."""
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, item_id = heapq.heappop(self._heap)
+                if self._expiries.get(item_id) == expires_at:
+                    del self._expiries[item_id]
+                    due.append(item_id)
+            timeout = self._heap[0][0] - now if self._heap else None
+        return due, timeout
+
+    async def _sweep(self, directory: str, ttl_seconds: float):
+        try:
+            added = await asyncio.to_thread(self.seed_from_directory, directory, ttl_seconds)
+        except Exception as e:
+            print(f"{self.name}: failed to sweep {directory}: {e}")
+            return
+        if added:
+            print(f"{self.name}: scheduled {added} unscheduled file(s) from {directory}")
+
+    async def run(self, sweep_directory: str = None, ttl_seconds: float = None, sweep_interval_seconds: float = None):
+        """
+        Run forever; start with asyncio.create_task at application startup.
+        With `sweep_directory`, files in it are scheduled at `ttl_seconds` after their
+        mtime: once at startup and then every `sweep_interval_seconds` as a backstop.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        next_sweep = None
+        if sweep_directory is not None:
+            await self._sweep(sweep_directory, ttl_seconds)
+            if sweep_interval_seconds:
+                next_sweep = time.time() + sweep_interval_seconds
+
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            if next_sweep is not None and now >= next_sweep:
+                await self._sweep(sweep_directory, ttl_seconds)
+                next_sweep = now + sweep_interval_seconds
+
+            due, timeout = self._pop_due(now)
+            if due:
+                try:
+                    failed = await asyncio.to_thread(self.on_expire, due) or []
+                except Exception as e:
+                    print(f"{self.name}: failed to expire {due}, will retry: {e}")
+                    failed = due
+                else:
+                    if failed:
+                        print(f"{self.name}: failed to expire {failed}, will retry")
+                self._expired([item_id for item_id in due if item_id not in failed])
+                self._retry_later(failed)
+                continue
+
+            if next_sweep is not None:
+                until_sweep = max(0.0, next_sweep - time.time())
+                timeout = until_sweep if timeout is None else min(timeout, until_sweep)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "scheduled": len(self._expiries),
+                "retrying": len(self._failures),
+                "next_expiry_in_seconds": max(0.0, self._heap[0][0] - time.time()) if self._heap else None,
+            }
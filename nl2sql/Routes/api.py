@@ -1,14 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import pandas as pd
 import decimal
 import json
 import datetime
-from ..services.query_generator import generate_sql
-from ..cors.database import execute_query
-from ..services.chart_generator import suggest_chart  # ✅ Using predefined rules again
-from ..services.summary_generator import generate_summary
-from ..services.chart_generator import decimal_to_float
+from auth import get_admin_user_async
+from ..services import sql_cache
+from ..nl2sql import nl2sql_processor
 
 router = APIRouter()
 
@@ -25,40 +23,47 @@ def decimal_to_serializable(obj):
 
 @router.post("/generate_sql/")
 async def generate_sql_endpoint(query_request: QueryRequest):
-    question = query_request.question
+    result = await nl2sql_processor.process_query_async(query_request.question)
 
-    # Generate SQL Query
-    sql_query = generate_sql(question)
-    if not sql_query:
-        # print("SQL execution error:", e)
-        raise HTTPException(status_code=500, detail="SQL query generation failed.")
+    # A failed query comes back without SQL; report it as an error status
+    if result["generated_sql"] is None:
+        raise HTTPException(status_code=500, detail=result["summary"])
+    return result
 
-    # Execute SQL Query
-    result_data = execute_query(sql_query)
-    if not result_data or len(result_data) == 0:
-        return {
-            "generated_sql": sql_query,
-            "data": [],
-            "best_chart": None,
-            "selected_columns": {},
-            "summary": "No data available for this query."
-        }
+@router.post("/generate_sql/stream")
+async def generate_sql_stream_endpoint(query_request: QueryRequest):
+    """
+    Streaming mode (NDJSON): the first line has generated_sql and data, then one line
+    each for the chart ({"best_chart", "selected_columns"}) and the summary ({"summary"})
+    in the order they finish.
+    """
+    parts = nl2sql_processor.stream_query(query_request.question)
 
-    # Convert decimal values
-    result_data = json.loads(json.dumps(result_data, default=decimal_to_float))
-    df = pd.DataFrame(result_data)
+    # The first part has the SQL and data; report a failure there as an error status
+    first = await parts.__anext__()
+    if first.get("error"):
+        await parts.aclose()
+        raise HTTPException(status_code=500, detail=first["error"])
 
-    # Get chart recommendations
-    best_chart, selected_columns, other_settings = suggest_chart(question, df)
+    async def stream():
+        yield json.dumps(first) + "\n"
+        async for part in parts:
+            yield json.dumps(part) + "\n"
 
-    # Generate Summary
-    summary = generate_summary(question, sql_query, df)
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
-    return {
-        "generated_sql": sql_query,
-        "data": result_data,
-        "best_chart": best_chart,
-        "selected_columns": selected_columns,  # ✅ Now properly included
-        "summary": summary
-    }
+# Question -> SQL cache administration (admins only: cached questions and SQL are not public)
+@router.get("/sql_cache/")
+async def sql_cache_entries(user_id: str = Depends(get_admin_user_async)):
+    return {"stats": sql_cache.get_cache_stats(), "entries": sql_cache.list_entries()}
 
+@router.delete("/sql_cache/{entry_id}")
+async def sql_cache_evict(entry_id: str, user_id: str = Depends(get_admin_user_async)):
+    if not sql_cache.evict(entry_id):
+        raise HTTPException(status_code=404, detail="Cache entry not found.")
+    return {"evicted": entry_id}
+
+@router.delete("/sql_cache/")
+async def sql_cache_clear(user_id: str = Depends(get_admin_user_async)):
+    sql_cache.clear_cache()
+    return {"cleared": True}
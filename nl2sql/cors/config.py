@@ -12,3 +12,15 @@ DB_CONFIG = {
 }
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Connection pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))  # mysql.connector allows at most 32
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))  # Wait for a free connection
+DB_POOL_PING_INTERVAL_SECONDS = float(os.getenv("DB_POOL_PING_INTERVAL_SECONDS", "30"))  # Ping connections idle longer than this
+DB_POOL_RECYCLE_SECONDS = float(os.getenv("DB_POOL_RECYCLE_SECONDS", "3600"))  # Reconnect connections older than this
+
+# Question -> SQL cache
+SQL_CACHE_MAX_ENTRIES = int(os.getenv("SQL_CACHE_MAX_ENTRIES", "1000"))
+SQL_CACHE_EMBED_MODEL = os.getenv("SQL_CACHE_EMBED_MODEL", "text-embedding-3-small")
+SQL_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("SQL_CACHE_SIMILARITY_THRESHOLD", "0.95"))  # Min cosine similarity for a semantic hit
+SQL_CACHE_DB_PATH = os.getenv("SQL_CACHE_DB_PATH")  # Optional on-disk copy, disabled when unset
@@ -1,32 +1,135 @@
-import mysql.connector
+import time
+import threading
 from mysql.connector import Error
-from .config import DB_CONFIG
+from mysql.connector.errors import PoolError
+from mysql.connector.pooling import MySQLConnectionPool
+from .config import (
+    DB_CONFIG,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_POOL_PING_INTERVAL_SECONDS,
+    DB_POOL_RECYCLE_SECONDS,
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Per physical connection (keyed by id): when it was opened and when it was last borrowed
+_connected_at = {}
+_last_used = {}
+
+pool_stats = {
+    "borrows": 0,
+    "waits": 0,
+    "pings": 0,
+    "reconnects": 0,
+    "recycles": 0,
+}
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = MySQLConnectionPool(
+                    pool_name="nl2sql",
+                    pool_size=DB_POOL_SIZE,
+                    pool_reset_session=True,
+                    **DB_CONFIG
+                )
+    return _pool
+
+
+def _check_connection(conn):
+    """
+    Health check and recycling for a borrowed connection: reconnect connections
+    older than DB_POOL_RECYCLE_SECONDS, and ping ones idle for longer than
+    DB_POOL_PING_INTERVAL_SECONDS (reconnecting if the server dropped them).
+    """
+    raw = conn._cnx  # Underlying MySQLConnection of the PooledMySQLConnection
+    key = id(raw)
+    now = time.time()
+    connected_at = _connected_at.setdefault(key, now)
+
+    if now - connected_at > DB_POOL_RECYCLE_SECONDS:
+        raw.reconnect(attempts=2, delay=0.1)
+        _connected_at[key] = now
+        pool_stats["recycles"] += 1
+    elif now - _last_used.get(key, now) > DB_POOL_PING_INTERVAL_SECONDS:
+        pool_stats["pings"] += 1
+        if not raw.is_connected():
+            raw.reconnect(attempts=2, delay=0.1)
+            _connected_at[key] = now
+            pool_stats["reconnects"] += 1
+
+    _last_used[key] = now
+
 
 def get_db_connection():
-    """Establish a database connection."""
+    """
+    Borrow a connection from the pool; conn.close() returns it to the pool.
+    Waits up to DB_POOL_TIMEOUT_SECONDS when all connections are in use.
+    """
+    deadline = time.monotonic() + DB_POOL_TIMEOUT_SECONDS
+    conn = None
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        if conn.is_connected():
-            return conn
+        pool = _get_pool()
+        while True:
+            try:
+                conn = pool.get_connection()
+                break
+            except PoolError:
+                # Pool exhausted
+                if time.monotonic() >= deadline:
+                    raise
+                pool_stats["waits"] += 1
+                time.sleep(0.05)
+        _check_connection(conn)
+        pool_stats["borrows"] += 1
+        return conn
     except Error as e:
         print("Error connecting to MySQL:", e)
+        if conn is not None:
+            # The health check's reconnect failed: return the connection to the pool
+            # (it reconnects on its next borrow) instead of leaking a pool slot
+            try:
+                conn.close()
+            except Error:
+                pass
         return None
 
-def execute_query(query: str):
-    """Executes a given SQL query and returns the result."""
+
+def run_query(query: str):
+    """Executes a given SQL query and returns the result; raises mysql.connector.Error on failure."""
     conn = get_db_connection()
     if conn is None:
-        return []
+        raise Error(msg="No database connection available")
 
+    cursor = None
     try:
         cursor = conn.cursor(dictionary=True)  # ✅ Ensures results are returned as dicts
         cursor.execute(query)
         rows = cursor.fetchall()  # Fetch all results
         conn.commit()  # Commit in case of data-modifying queries (INSERT, UPDATE, DELETE)
         return rows
+    finally:
+        if cursor is not None:
+            cursor.close()
+        conn.close()  # Returns the connection to the pool
+
+
+def execute_query(query: str):
+    """Executes a given SQL query and returns the result ([] on error)."""
+    try:
+        return run_query(query)
     except Error as e:
         print("Error executing query:", e)
         return []
-    finally:
-        cursor.close()
-        conn.close()
+
+
+def get_pool_stats():
+    return {
+        **pool_stats,
+        "pool_size": DB_POOL_SIZE,
+    }
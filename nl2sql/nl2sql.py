@@ -1,11 +1,11 @@
 import pandas as pd
+import asyncio
 import decimal
 import json
 import datetime
-from .services.query_generator import generate_sql
-from .cors.database import execute_query
-from .services.chart_generator import suggest_chart, decimal_to_float
-from .services.summary_generator import generate_summary
+from .services.query_generator import generate_and_execute
+from .services.chart_generator import decimal_to_float
+from .services.insights import generate_insights, generate_insights_sync, iter_insights
 
 
 class NL2SQLProcessor:
@@ -18,14 +18,11 @@ class NL2SQLProcessor:
         """Process natural language question and return full response"""
 
         try:
-            # Step 1: Generate SQL
-            sql_query = generate_sql(question)
+            # Step 1-2: Generate and execute the SQL query
+            sql_query, result_data = generate_and_execute(question)
             if not sql_query:
                 raise Exception("SQL query generation failed.")
 
-            # Step 2: Execute SQL query
-            result_data = execute_query(sql_query)
-
             if not result_data or len(result_data) == 0:
                 return {
                     "generated_sql": sql_query,
@@ -39,19 +36,60 @@ class NL2SQLProcessor:
             result_data = json.loads(json.dumps(result_data, default=decimal_to_float))
             df = pd.DataFrame(result_data)
 
-            # Step 4: Suggest chart
-            best_chart, selected_columns, other_settings = suggest_chart(question, df)
+            # Step 4-5: Suggest chart and generate summary concurrently
+            insights = generate_insights_sync(question, sql_query, df)
+
+            # Step 6: Return final response
+            return {
+                "generated_sql": sql_query,
+                "data": result_data,
+                **insights
+            }
+
+        except Exception as e:
+            return {
+                "generated_sql": None,
+                "data": [],
+                "best_chart": None,
+                "selected_columns": {},
+                "summary": f"Error occurred: {str(e)}"
+            }
+
+    async def _query_data(self, question: str):
+        """Generate and execute the SQL (blocking calls run in worker threads)"""
+        sql_query, result_data = await asyncio.to_thread(generate_and_execute, question)
+        if not sql_query:
+            raise Exception("SQL query generation failed.")
+
+        # Convert result to serializable format
+        result_data = json.loads(json.dumps(result_data or [], default=decimal_to_float))
+        return sql_query, result_data
+
+    async def process_query_async(self, question: str):
+        """Async version of process_query; the chart and summary requests run concurrently"""
+
+        try:
+            # Step 1-3: Generate SQL, execute it and convert the result
+            sql_query, result_data = await self._query_data(question)
+
+            if not result_data:
+                return {
+                    "generated_sql": sql_query,
+                    "data": [],
+                    "best_chart": None,
+                    "selected_columns": {},
+                    "summary": "No data available for this query."
+                }
 
-            # Step 5: Generate summary
-            summary = generate_summary(question, sql_query, df)
+            # Step 4-5: Suggest chart and generate summary concurrently
+            df = pd.DataFrame(result_data)
+            insights = await generate_insights(question, sql_query, df)
 
             # Step 6: Return final response
             return {
                 "generated_sql": sql_query,
                 "data": result_data,
-                "best_chart": best_chart,
-                "selected_columns": selected_columns,
-                "summary": summary
+                **insights
             }
 
         except Exception as e:
@@ -63,6 +101,27 @@ class NL2SQLProcessor:
                 "summary": f"Error occurred: {str(e)}"
             }
 
+    async def stream_query(self, question: str):
+        """
+        Streaming mode: yield {"generated_sql", "data"} as soon as the query has run,
+        then the chart and summary parts as each request finishes.
+        """
+        try:
+            sql_query, result_data = await self._query_data(question)
+        except Exception as e:
+            yield {"generated_sql": None, "data": [], "error": f"Error occurred: {str(e)}"}
+            return
+
+        yield {"generated_sql": sql_query, "data": result_data}
+
+        if not result_data:
+            yield {"best_chart": None, "selected_columns": {}}
+            yield {"summary": "No data available for this query."}
+            return
+
+        async for part in iter_insights(question, sql_query, pd.DataFrame(result_data)):
+            yield part
+
 
 # Create instance for easy import (following company pattern)
 nl2sql_processor = NL2SQLProcessor()
@@ -75,3 +134,10 @@ def ask_nl2sql(question: str):
 
     # Use the NL2SQLProcessor class to process query
     return nl2sql_processor.process_query(question)
+
+
+async def ask_nl2sql_async(question: str):
+    """Async version of ask_nl2sql, for callers already running in an event loop"""
+
+    print(f"Received question: {question}")
+    return await nl2sql_processor.process_query_async(question)
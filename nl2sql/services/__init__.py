@@ -2,8 +2,14 @@
 NL2SQL Services
 """
 
-from .chart_generator import suggest_chart, decimal_to_float
-from .query_generator import generate_sql
-from .summary_generator import generate_summary
+from .chart_generator import suggest_chart, suggest_chart_async, decimal_to_float
+from .query_generator import generate_sql, generate_and_execute
+from .summary_generator import generate_summary, generate_summary_async
+from .insights import generate_insights, generate_insights_sync, iter_insights
+from . import sql_cache
 
-__all__ = ['suggest_chart', 'decimal_to_float', 'generate_sql', 'generate_summary']
\ No newline at end of file
+__all__ = [
+    'suggest_chart', 'suggest_chart_async', 'decimal_to_float', 'generate_sql', 'generate_and_execute',
+    'generate_summary', 'generate_summary_async',
+    'generate_insights', 'generate_insights_sync', 'iter_insights', 'sql_cache',
+]
@@ -3,7 +3,7 @@ import re
 import decimal
 import pandas as pd
 import datetime
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 
 from dotenv import load_dotenv
 import os
@@ -12,6 +12,7 @@ load_dotenv()  # Load .env variables into environment
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 client = OpenAI(api_key=OPENAI_API_KEY)
+async_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
 def decimal_to_float(obj):
     
@@ -21,19 +22,7 @@ def decimal_to_float(obj):
         return obj.strftime("%Y-%m-%d")
     raise TypeError(f"Type {type(obj)} not serializable")
 
-def suggest_chart(question: str, df: pd.DataFrame):
-    """
-    This function sends the data and question to GPT-4o and lets it decide the best chart for the query.
-    """
-
-    # Initialize selected_columns to an empty dictionary (or use default values as needed)
-    selected_columns = {}
-
-    # If there's no data, return a default response
-    if df.empty:
-        print("⚠️ No data available, returning default response.")
-        return None, {}, {}
-
+def _chart_messages(question: str, df: pd.DataFrame):
     # Convert dataframe to JSON-like format
     data_sample = df.head(10).to_dict(orient="records")
     data_sample = json.loads(json.dumps(data_sample, default=decimal_to_float))
@@ -73,17 +62,13 @@ def suggest_chart(question: str, df: pd.DataFrame):
         ```
         """}
     ]
+    return messages
 
-    # Send request to GPT-4o
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=messages,
-        max_tokens=1000,
-        temperature=0.7
-    )
 
+def _parse_chart_response(response_text: str):
+    """Parse GPT-4o's chart recommendation into (best_chart, selected_columns, other_settings)."""
     try:
-        response_text = response.choices[0].message.content.strip()
+        response_text = (response_text or "").strip()
 
         # Debugging: Print raw response to check its format
         print(f"🔍 GPT-4o Raw Response: {response_text}")
@@ -122,4 +107,39 @@ def suggest_chart(question: str, df: pd.DataFrame):
 
     except json.JSONDecodeError as e:
         print(f"❌ JSON Parsing Error: {e}")
-        return None, {}, {}
\ No newline at end of file
+        return None, {}, {}
+
+
+def suggest_chart(question: str, df: pd.DataFrame):
+    """
+    This function sends the data and question to GPT-4o and lets it decide the best chart for the query.
+    """
+
+    # If there's no data, return a default response
+    if df.empty:
+        print("⚠️ No data available, returning default response.")
+        return None, {}, {}
+
+    # Send request to GPT-4o
+    response = client.chat.completions.create(
+        model="gpt-4o",
+        messages=_chart_messages(question, df),
+        max_tokens=1000,
+        temperature=0.7
+    )
+    return _parse_chart_response(response.choices[0].message.content)
+
+
+async def suggest_chart_async(question: str, df: pd.DataFrame):
+    """Async version of suggest_chart, so it can run concurrently with the summary request."""
+    if df.empty:
+        print("⚠️ No data available, returning default response.")
+        return None, {}, {}
+
+    response = await async_client.chat.completions.create(
+        model="gpt-4o",
+        messages=_chart_messages(question, df),
+        max_tokens=1000,
+        temperature=0.7
+    )
+    return _parse_chart_response(response.choices[0].message.content)
@@ -11,8 +11,9 @@ def execute_query(query: str):
         cursor.execute(query)
         result = cursor.fetchall()
         cursor.close()
-        conn.close()
         return result
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error executing SQL: {str(e)}")
+    finally:
+        conn.close()  # Always return the connection to the pool
@@ -0,0 +1,73 @@
+import asyncio
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from .chart_generator import suggest_chart, suggest_chart_async
+from .summary_generator import generate_summary, generate_summary_async
+
+# Worker threads for synchronous callers (two per query: chart and summary)
+_executor = ThreadPoolExecutor(max_workers=4)
+
+
+async def generate_insights(question: str, sql_query: str, df: pd.DataFrame) -> dict:
+    """
+    Run the chart suggestion and the summary requests concurrently.
+    They are independent GPT-4o calls over the same DataFrame, so the total
+    latency is the slower of the two instead of their sum.
+    """
+    (best_chart, selected_columns, other_settings), summary = await asyncio.gather(
+        suggest_chart_async(question, df),
+        generate_summary_async(question, sql_query, df),
+    )
+    return {
+        "best_chart": best_chart,
+        "selected_columns": selected_columns,
+        "summary": summary,
+    }
+
+
+def generate_insights_sync(question: str, sql_query: str, df: pd.DataFrame) -> dict:
+    """
+    Same as generate_insights for synchronous callers, using the sync OpenAI
+    clients on worker threads (an AsyncOpenAI client can't be shared across the
+    short-lived event loops asyncio.run would create).
+    """
+    chart_future = _executor.submit(suggest_chart, question, df)
+    summary_future = _executor.submit(generate_summary, question, sql_query, df)
+    best_chart, selected_columns, other_settings = chart_future.result()
+    return {
+        "best_chart": best_chart,
+        "selected_columns": selected_columns,
+        "summary": summary_future.result(),
+    }
+
+
+async def iter_insights(question: str, sql_query: str, df: pd.DataFrame):
+    """
+    Yield the chart and summary parts as soon as each request finishes:
+    {"best_chart": ..., "selected_columns": ...} and {"summary": ...}.
+    A failed request yields {"error": ..., "part": "chart" | "summary"}.
+    """
+    async def run_part(part, coro):
+        try:
+            return await coro
+        except Exception as e:
+            return {"error": str(e), "part": part}
+
+    async def chart():
+        best_chart, selected_columns, other_settings = await suggest_chart_async(question, df)
+        return {"best_chart": best_chart, "selected_columns": selected_columns}
+
+    async def summary():
+        return {"summary": await generate_summary_async(question, sql_query, df)}
+
+    tasks = [
+        asyncio.ensure_future(run_part("chart", chart())),
+        asyncio.ensure_future(run_part("summary", summary())),
+    ]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            yield await completed
+    finally:
+        # Client disconnected mid-stream: don't leave requests running
+        for task in tasks:
+            task.cancel()
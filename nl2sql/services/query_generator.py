@@ -1,6 +1,9 @@
 import re
 from openai import OpenAI
+from mysql.connector import Error
 from ..cors.config import OPENAI_API_KEY
+from ..cors.database import run_query
+from . import sql_cache
 from dotenv import load_dotenv
 import os
 
@@ -50,7 +53,48 @@ Important Notes:
 Please make sure that all references are properly resolved (e.g., `customer_id` from `orders` must be unambiguous, and `category` should refer to `categories.category_id`).
 """
 
+# Cached SQL is only valid for the schema it was generated against
+sql_cache.set_schema_version(SCHEMA_DESCRIPTION)
+
+def _lookup_or_generate(question: str):
+    """Returns (sql_query, from_cache, embedding); see sql_cache.lookup for embedding."""
+    sql_query, match, embedding = sql_cache.lookup(question)
+    if sql_query is not None:
+        print(f"SQL cache hit ({match['tier']}, similarity {match['similarity']})")
+        return sql_query, True, None
+    return _generate_sql_uncached(question), False, embedding
+
 def generate_sql(question: str):
+    """
+    Return SQL for a question, from the question->SQL cache when an identical or
+    sufficiently similar question was answered before, otherwise from GPT-4o.
+    SQL generated here is not cached, since it hasn't been run; use
+    generate_and_execute to cache it.
+    """
+    sql_query, from_cache, embedding = _lookup_or_generate(question)
+    return sql_query
+
+def generate_and_execute(question: str):
+    """
+    Generate SQL for a question (see generate_sql) and execute it. Returns
+    (sql_query, rows); rows is [] if the query failed. Newly generated SQL is
+    cached only after it has executed without error.
+    """
+    sql_query, from_cache, embedding = _lookup_or_generate(question)
+    if not sql_query:
+        return None, []
+
+    try:
+        rows = run_query(sql_query)
+    except Error as e:
+        print("Error executing query:", e)
+        return sql_query, []
+
+    if not from_cache:
+        sql_cache.store(question, sql_query, embedding)
+    return sql_query, rows
+
+def _generate_sql_uncached(question: str):
     attempt = 0
     sql_query = None
 
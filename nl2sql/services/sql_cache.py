@@ -0,0 +1,293 @@
+import os
+import re
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from openai import OpenAI
+from dotenv import load_dotenv
+from ..cors.config import (
+    SQL_CACHE_MAX_ENTRIES,
+    SQL_CACHE_EMBED_MODEL,
+    SQL_CACHE_SIMILARITY_THRESHOLD,
+    SQL_CACHE_DB_PATH,
+)
+
+load_dotenv()  # Load .env variables into environment
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+client = OpenAI(api_key=OPENAI_API_KEY)
+
+# Question -> SQL cache with two tiers:
+#   exact:    normalized question text
+#   semantic: cosine similarity of question embeddings >= SQL_CACHE_SIMILARITY_THRESHOLD
+# Entries are tagged with a hash of the schema description, so editing the schema
+# invalidates every SQL generated against the old one.
+
+_entries = OrderedDict()  # entry_id -> entry dict, in LRU order
+_exact_index = {}  # normalized question -> entry_id
+_lock = threading.Lock()
+
+_schema_version = None
+_disk_conn = None
+
+cache_stats = {
+    "exact_hits": 0,
+    "semantic_hits": 0,
+    "misses": 0,
+    "evictions": 0,
+}
+
+
+def normalize_question(question: str) -> str:
+    """
+    Lowercase, collapse whitespace and drop trailing sentence punctuation.
+    Everything else is kept: operators, signs and punctuation inside numbers
+    ("> 100", "-5", "3.5", "1,000") change the SQL.
+    """
+    question = re.sub(r"\s+", " ", question.lower()).strip()
+    return re.sub(r"[\s?.!]+$", "", question)
+
+
+_MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3,
+    "april": 4, "apr": 4, "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7,
+    "august": 8, "aug": 8, "september": 9, "sep": 9, "sept": 9, "october": 10, "oct": 10,
+    "november": 11, "nov": 11, "december": 12, "dec": 12,
+}
+_MONTH_PATTERN = re.compile(r"\b(" + "|".join(_MONTHS) + r")\b")
+# A quoted value: the quotes must sit at word edges, so "customer's" doesn't open one
+_QUOTED_PATTERN = re.compile(r"(?:^|(?<=[\s(=,]))(['\"‘“])(.+?)['\"’”](?=$|[\s),.?!;:])")
+
+
+def _literals(normalized: str) -> set:
+    """
+    Values that must match for a semantic hit: numeric literals (years, limits, IDs,
+    with sign and decimals), comparison operators, quoted strings and month names.
+    """
+    numbers = re.findall(r"-?\d+(?:[.,]\d+)*", normalized)
+    operators = re.findall(r"[<>!]=?|=", normalized)
+    quoted = ["'" + value + "'" for _, value in _QUOTED_PATTERN.findall(normalized)]
+    months = ["month:%d" % _MONTHS[name] for name in _MONTH_PATTERN.findall(normalized)]
+    return set(numbers) | set(operators) | set(quoted) | set(months)
+
+
+def schema_hash(schema_description: str) -> str:
+    return hashlib.sha256(schema_description.encode("utf-8")).hexdigest()[:12]
+
+
+def _embed(text: str) -> np.ndarray:
+    response = client.embeddings.create(model=SQL_CACHE_EMBED_MODEL, input=[text])
+    vector = np.array(response.data[0].embedding, dtype=np.float32)
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+
+def _get_disk_conn():
+    global _disk_conn
+    if _disk_conn is None:
+        os.makedirs(os.path.dirname(os.path.abspath(SQL_CACHE_DB_PATH)), exist_ok=True)
+        _disk_conn = sqlite3.connect(SQL_CACHE_DB_PATH, check_same_thread=False)
+        _disk_conn.execute(
+            "CREATE TABLE IF NOT EXISTS sql_cache ("
+            "entry_id TEXT PRIMARY KEY, schema_version TEXT NOT NULL, question TEXT NOT NULL, "
+            "normalized TEXT NOT NULL, sql_query TEXT NOT NULL, embedding BLOB, created_at REAL NOT NULL)"
+        )
+        _disk_conn.commit()
+    return _disk_conn
+
+
+def _add_entry(entry):
+    """Insert into the in-memory tiers; caller holds _lock."""
+    old_id = _exact_index.get(entry["normalized"])
+    if old_id is not None:
+        _entries.pop(old_id, None)
+    _entries[entry["entry_id"]] = entry
+    _exact_index[entry["normalized"]] = entry["entry_id"]
+    while len(_entries) > SQL_CACHE_MAX_ENTRIES:
+        _, evicted = _entries.popitem(last=False)
+        _exact_index.pop(evicted["normalized"], None)
+        cache_stats["evictions"] += 1
+        if SQL_CACHE_DB_PATH:
+            _get_disk_conn().execute("DELETE FROM sql_cache WHERE entry_id = ?", (evicted["entry_id"],))
+
+
+def set_schema_version(schema_description: str):
+    """
+    Set the schema the cached SQL was generated against. Entries for any other
+    schema version are dropped; entries for this version are loaded from disk.
+    """
+    global _schema_version
+    version = schema_hash(schema_description)
+    with _lock:
+        if version == _schema_version:
+            return
+        _schema_version = version
+        _entries.clear()
+        _exact_index.clear()
+        if not SQL_CACHE_DB_PATH:
+            return
+
+        conn = _get_disk_conn()
+        conn.execute("DELETE FROM sql_cache WHERE schema_version != ?", (version,))
+        rows = conn.execute(
+            "SELECT entry_id, question, normalized, sql_query, embedding, created_at FROM sql_cache "
+            "WHERE schema_version = ? ORDER BY created_at",
+            (version,)
+        ).fetchall()
+        for entry_id, question, normalized, sql_query, embedding, created_at in rows:
+            _add_entry({
+                "entry_id": entry_id,
+                "question": question,
+                "normalized": normalized,
+                "sql_query": sql_query,
+                "embedding": np.frombuffer(embedding, dtype=np.float32) if embedding else None,
+                "created_at": created_at,
+                "hits": 0,
+            })
+        conn.commit()
+
+
+def lookup(question: str):
+    """
+    Find cached SQL for a question.
+    Returns (sql_query, match_info, embedding). sql_query is None on a miss; the
+    question's embedding (when computed) is returned so store() doesn't recompute it.
+    """
+    normalized = normalize_question(question)
+    with _lock:
+        entry_id = _exact_index.get(normalized)
+        if entry_id is not None:
+            entry = _entries[entry_id]
+            _entries.move_to_end(entry_id)
+            entry["hits"] += 1
+            cache_stats["exact_hits"] += 1
+            return entry["sql_query"], {"tier": "exact", "entry_id": entry_id, "similarity": 1.0}, None
+        has_embeddings = any(entry["embedding"] is not None for entry in _entries.values())
+
+    if not has_embeddings:
+        cache_stats["misses"] += 1
+        return None, None, None
+
+    try:
+        embedding = _embed(question)
+    except Exception as e:
+        print(f"SQL cache: embedding failed, skipping semantic lookup: {e}")
+        cache_stats["misses"] += 1
+        return None, None, None
+
+    literals = _literals(normalized)
+    with _lock:
+        best_id, best_score = None, -1.0
+        for entry_id, entry in _entries.items():
+            # "sales in 2023" and "sales in 2024" (or "in January" and "in March",
+            # "category 'Books'" and "'Toys'") embed almost identically but need different SQL
+            if entry["embedding"] is None or _literals(entry["normalized"]) != literals:
+                continue
+            score = float(np.dot(entry["embedding"], embedding))
+            if score > best_score:
+                best_id, best_score = entry_id, score
+
+        if best_id is not None and best_score >= SQL_CACHE_SIMILARITY_THRESHOLD:
+            entry = _entries[best_id]
+            _entries.move_to_end(best_id)
+            entry["hits"] += 1
+            cache_stats["semantic_hits"] += 1
+            return entry["sql_query"], {
+                "tier": "semantic",
+                "entry_id": best_id,
+                "similarity": round(best_score, 4),
+                "cached_question": entry["question"],
+            }, embedding
+
+    cache_stats["misses"] += 1
+    return None, None, embedding
+
+
+def store(question: str, sql_query: str, embedding: np.ndarray = None):
+    """Cache SQL generated for a question, embedding the question if lookup() didn't."""
+    if embedding is None:
+        try:
+            embedding = _embed(question)
+        except Exception as e:
+            # Still usable by the exact tier
+            print(f"SQL cache: embedding failed, storing exact match only: {e}")
+
+    entry = {
+        "entry_id": uuid.uuid4().hex,
+        "question": question,
+        "normalized": normalize_question(question),
+        "sql_query": sql_query,
+        "embedding": embedding,
+        "created_at": time.time(),
+        "hits": 0,
+    }
+    with _lock:
+        _add_entry(entry)
+        if SQL_CACHE_DB_PATH:
+            conn = _get_disk_conn()
+            conn.execute("DELETE FROM sql_cache WHERE normalized = ? AND schema_version = ?", (entry["normalized"], _schema_version))
+            conn.execute(
+                "INSERT INTO sql_cache (entry_id, schema_version, question, normalized, sql_query, embedding, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    entry["entry_id"], _schema_version, question, entry["normalized"], sql_query,
+                    embedding.astype(np.float32).tobytes() if embedding is not None else None,
+                    entry["created_at"],
+                )
+            )
+            conn.commit()
+
+
+def list_entries():
+    """Cached entries (most recently used first) for the admin endpoint."""
+    with _lock:
+        return [
+            {
+                "entry_id": entry["entry_id"],
+                "question": entry["question"],
+                "sql_query": entry["sql_query"],
+                "hits": entry["hits"],
+                "created_at": entry["created_at"],
+                "has_embedding": entry["embedding"] is not None,
+            }
+            for entry in reversed(_entries.values())
+        ]
+
+
+def evict(entry_id: str) -> bool:
+    """Remove one entry, e.g. a cached query that turned out to be wrong."""
+    with _lock:
+        entry = _entries.pop(entry_id, None)
+        if entry is None:
+            return False
+        _exact_index.pop(entry["normalized"], None)
+        if SQL_CACHE_DB_PATH:
+            conn = _get_disk_conn()
+            conn.execute("DELETE FROM sql_cache WHERE entry_id = ?", (entry_id,))
+            conn.commit()
+    return True
+
+
+def clear_cache():
+    with _lock:
+        _entries.clear()
+        _exact_index.clear()
+        if SQL_CACHE_DB_PATH:
+            conn = _get_disk_conn()
+            conn.execute("DELETE FROM sql_cache")
+            conn.commit()
+
+
+def get_cache_stats():
+    hits = cache_stats["exact_hits"] + cache_stats["semantic_hits"]
+    lookups = hits + cache_stats["misses"]
+    return {
+        **cache_stats,
+        "entries": len(_entries),
+        "schema_version": _schema_version,
+        "similarity_threshold": SQL_CACHE_SIMILARITY_THRESHOLD,
+        "hit_ratio": hits / lookups if lookups else 0.0,
+    }
@@ -1,5 +1,5 @@
 import pandas as pd
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from ..cors.config import OPENAI_API_KEY
 from dotenv import load_dotenv
 import os
@@ -8,11 +8,9 @@ load_dotenv()  # Load .env variables into environment
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 client = OpenAI(api_key=OPENAI_API_KEY)
+async_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
-def generate_summary(question: str, sql_query: str, df: pd.DataFrame) -> str:
-    """
-    Generates a human-readable summary based on the SQL query and result data.
-    """
+def _summary_prompt(question: str, sql_query: str, df: pd.DataFrame) -> str:
     # Convert dataframe to JSON-like string format for better context
     data_sample = df.head(10).to_dict(orient="records")
 
@@ -26,10 +24,24 @@ def generate_summary(question: str, sql_query: str, df: pd.DataFrame) -> str:
     
     Your task is to write a concise summary in natural language.
     """
+    return prompt
 
+def generate_summary(question: str, sql_query: str, df: pd.DataFrame) -> str:
+    """
+    Generates a human-readable summary based on the SQL query and result data.
+    """
     response = client.chat.completions.create(
         model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}]
+        messages=[{"role": "user", "content": _summary_prompt(question, sql_query, df)}]
+    )
+
+    return response.choices[0].message.content.strip()
+
+async def generate_summary_async(question: str, sql_query: str, df: pd.DataFrame) -> str:
+    """Async version of generate_summary, so it can run concurrently with the chart request."""
+    response = await async_client.chat.completions.create(
+        model="gpt-4o",
+        messages=[{"role": "user", "content": _summary_prompt(question, sql_query, df)}]
     )
 
-    return response.choices[0].message.content.strip()
\ No newline at end of file
+    return response.choices[0].message.content.strip()
@@ -1,25 +1,39 @@
 import os
-import time
-import asyncio
+from expiry_scheduler import ExpiryScheduler
 from .config import TEMP_UPLOAD_DIR, PDF_TTL_SECONDS, CLEANUP_INTERVAL_SECONDS
-from .embeddings import delete_vectors_by_pdf_id
+from .embeddings import delete_vectors_by_pdf_ids
+
+
+def _expire_pdfs(pdf_ids):
+    """Remove expired PDFs and their vectors; returns the IDs whose file could not be deleted."""
+    deleted_files = []
+    failed = []
+    for pdf_id in pdf_ids:
+        try:
+            os.remove(os.path.join(TEMP_UPLOAD_DIR, pdf_id))
+        except FileNotFoundError:
+            pass  # Already gone; its vectors still need removing
+        except Exception as e:
+            print(f"Failed to delete {pdf_id}: {e}")
+            failed.append(pdf_id)
+            continue
+        deleted_files.append(pdf_id)
+    if deleted_files:
+        # Remove vectors for all expired PDFs in one batch (raises -> the scheduler retries)
+        delete_vectors_by_pdf_ids(deleted_files)
+        print(f"Cleanup: Removed PDFs and vectors for {deleted_files}")
+    return failed
+
+
+expiry_scheduler = ExpiryScheduler("pdf_data_extraction cleanup", _expire_pdfs)
+
+
+def schedule_pdf_expiry(pdf_id: str):
+    """Call after saving an upload; the PDF and its vectors are removed PDF_TTL_SECONDS later."""
+    expiry_scheduler.schedule(pdf_id, PDF_TTL_SECONDS)
+
 
 async def cleanup_task():
-    while True:
-        now = time.time()
-        deleted_files = []
-        for filename in os.listdir(TEMP_UPLOAD_DIR):
-            filepath = os.path.join(TEMP_UPLOAD_DIR, filename)
-            if not os.path.isfile(filepath):
-                continue
-            file_age = now - os.path.getmtime(filepath)
-            if file_age > PDF_TTL_SECONDS:
-                try:
-                    os.remove(filepath)
-                    delete_vectors_by_pdf_id(filename)
-                    deleted_files.append(filename)
-                except Exception as e:
-                    print(f"Failed to delete {filename}: {e}")
-        if deleted_files:
-            print(f"Cleanup: Removed PDFs and vectors for {deleted_files}")
-        await asyncio.sleep(CLEANUP_INTERVAL_SECONDS)
+    # Schedules existing uploads at startup, then sweeps every CLEANUP_INTERVAL_SECONDS
+    # for uploads that were saved without calling schedule_pdf_expiry
+    await expiry_scheduler.run(TEMP_UPLOAD_DIR, PDF_TTL_SECONDS, CLEANUP_INTERVAL_SECONDS)
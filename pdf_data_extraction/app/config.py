@@ -5,4 +5,40 @@ TEMP_UPLOAD_DIR = os.path.join(BASE_DIR, "tmp_uploads")
 os.makedirs(TEMP_UPLOAD_DIR, exist_ok=True)
 
 PDF_TTL_SECONDS = 3600  # 1 hour TTL for demo
-CLEANUP_INTERVAL_SECONDS = 1800  # Cleanup every 30 mins
+CLEANUP_INTERVAL_SECONDS = 1800  # Backstop sweep for uploads that were never scheduled
+
+# Embedding batching
+EMBED_MODEL = "text-embedding-ada-002"
+EMBED_BATCH_MAX_TOKENS = 100000  # Approximate token budget per embeddings request
+# Max chunks per embeddings request (API limit is 2048). Kept small so a batch is
+# submitted after a few pages of parsing and several batches of a document run concurrently.
+EMBED_BATCH_MAX_INPUTS = 64
+EMBED_MAX_CONCURRENCY = 4  # Batches embedded in parallel
+EMBED_MAX_RETRIES = 5  # Retries per batch on rate limit / transient errors
+
+# Persistent vector store (FAISS index files + SQLite metadata), shared by all workers
+VECTOR_STORE_DIR = os.path.join(BASE_DIR, "vector_store")
+os.makedirs(VECTOR_STORE_DIR, exist_ok=True)
+
+# Vector index backend per PDF partition: "auto", "flat", "hnsw" or "ivfpq"
+# "auto" uses exact search below ANN_THRESHOLD vectors and HNSW above it.
+# Queries only search the asked PDF's partition, so the threshold is compared with
+# the size of one document, not the corpus: a flat scan of 5000 vectors reads
+# ~30 MB per query, where HNSW starts to pay off.
+INDEX_BACKEND = "auto"
+ANN_THRESHOLD = 5000
+HNSW_M = 32  # Graph neighbours per node
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 128  # Higher = better recall, slower queries
+IVFPQ_SUBQUANTIZERS = 96  # 1536 dims / 96 = 16 dims per sub-vector, 96 bytes per vector
+IVFPQ_NPROBE = 16  # Inverted lists scanned per query
+IVFPQ_MIN_TRAINING_POINTS = 256  # One per PQ centroid (8-bit codes); smaller partitions use flat
+
+# Q&A caches
+QUERY_EMBED_CACHE_SIZE = 10000  # Question text -> embedding entries
+ANSWER_CACHE_SIZE = 5000  # (pdf_id, question, chunk IDs) -> answer entries
+
+# Token-aware chunking (cl100k_base tokens, the text-embedding-ada-002 tokenizer)
+CHUNK_MAX_TOKENS = 500  # Tokens per chunk
+CHUNK_OVERLAP_TOKENS = 50  # Tokens repeated from the end of the previous chunk
+CHUNK_MIN_TOKENS = 100  # A shorter final tail is merged into the previous chunk
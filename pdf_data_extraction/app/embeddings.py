@@ -50,12 +50,33 @@
 
 
 import os
+import json
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import openai
 import numpy as np
 import uuid
-import faiss
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Tuple
+from . import vector_store
+from .pdf_utils import count_tokens
+from .index_factory import build_index, index_vectors
+from .qa_cache import (
+    normalize_question,
+    query_embedding_cache,
+    answer_cache,
+    answer_cache_key,
+    cache_answer,
+    invalidate_pdf_answers,
+)
+from .config import (
+    EMBED_MODEL,
+    EMBED_BATCH_MAX_TOKENS,
+    EMBED_BATCH_MAX_INPUTS,
+    EMBED_MAX_CONCURRENCY,
+    EMBED_MAX_RETRIES,
+)
 
 load_dotenv()
 
@@ -66,12 +87,23 @@ if openai.api_key is None:
 # Dimension of embedding (OpenAI's text-embedding-ada-002 outputs 1536-dimensional vectors)
 EMBED_DIM = 1536
 
-# FAISS index and metadata store
-index = faiss.IndexFlatIP(EMBED_DIM)  # Using Inner Product for cosine similarity (after normalization)
+# FAISS indexes and metadata store
+# Vectors are partitioned per PDF so a query only scans the target document's vectors.
+# Partitions are persisted by vector_store and loaded (memory-mapped) on first use,
+# so these dicts only hold the PDFs this worker has touched.
+pdf_indexes = {}  # Map pdf_id to its own FAISS index
 metadata_store = {}  # Map vector ID (int) to metadata dict
+pdf_vector_ids = {}  # Map pdf_id to the vector IDs stored for it
+pdf_index_versions = {}  # Map pdf_id to the version of the index file it was loaded from
 
-# Keep track of vector IDs assigned
-vector_id_counter = 0
+
+def normalize_vectors(vectors: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize each row of a (n, EMBED_DIM) matrix in place, leaving zero rows untouched.
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
 
 
 def embed_text(text: str) -> np.ndarray:
@@ -80,73 +112,252 @@ def embed_text(text: str) -> np.ndarray:
     """
     response = openai.embeddings.create(
         input=text,
-        model="text-embedding-ada-002"
+        model=EMBED_MODEL
     )
-    vector = response.data[0].embedding
-    vector = np.array(vector, dtype=np.float32)
-    norm = np.linalg.norm(vector)
-    if norm > 0:
-        vector /= norm
+    vector = np.array([response.data[0].embedding], dtype=np.float32)
+    return normalize_vectors(vector)[0]
+
+
+def embed_query(question: str) -> np.ndarray:
+    """
+    Embed a question, reusing the cached embedding for repeated (normalized) questions.
+    The original text is embedded; the normalized form is only the cache key.
+    """
+    key = normalize_question(question)
+    vector = query_embedding_cache.get(key)
+    if vector is None:
+        start = time.perf_counter()
+        vector = embed_text(question)
+        query_embedding_cache.put(key, vector, time.perf_counter() - start)
     return vector
 
 
-def store_embeddings(pdf_id: str, chunks: List[str]) -> List[str]:
+def iter_batches(chunks: Iterable) -> Iterator[List[str]]:
+    """
+    Group chunks into batches that stay under the per-request token and input limits,
+    yielding each batch as soon as it is full.
+    Chunks are strings, or (text, token_count) pairs when the count is already known.
+    """
+    current = []
+    current_tokens = 0
+    for chunk in chunks:
+        if isinstance(chunk, tuple):
+            chunk, tokens = chunk
+        else:
+            tokens = count_tokens(chunk)
+        if current and (current_tokens + tokens > EMBED_BATCH_MAX_TOKENS or len(current) >= EMBED_BATCH_MAX_INPUTS):
+            yield current
+            current = []
+            current_tokens = 0
+        current.append(chunk)
+        current_tokens += tokens
+    if current:
+        yield current
+
+
+def _retry_delay(error, attempt: int) -> float:
+    """
+    Use the server's Retry-After header when present, otherwise exponential backoff with jitter.
+    """
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    return min(2 ** attempt, 60) + random.uniform(0, 1)
+
+
+def _embed_batch_request(texts: List[str]) -> np.ndarray:
+    """
+    Embed one batch in a single API request, retrying on rate limits and transient errors.
+    """
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        try:
+            response = openai.embeddings.create(
+                input=texts,
+                model=EMBED_MODEL
+            )
+            # The API returns one item per input, tagged with its position
+            ordered = sorted(response.data, key=lambda item: item.index)
+            return np.array([item.embedding for item in ordered], dtype=np.float32)
+        except (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError) as e:
+            if attempt == EMBED_MAX_RETRIES:
+                raise
+            delay = _retry_delay(e, attempt)
+            print(f"Embedding batch failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def embed_chunks(chunks: Iterable) -> Tuple[List[str], np.ndarray]:
+    """
+    Embed chunks (strings or (text, token_count) pairs, see iter_batches) using
+    token-budgeted batch requests run concurrently.
+    `chunks` may be a lazy iterator (e.g. from pdf_utils.iter_token_chunks): each batch is
+    submitted as soon as it is full, so embedding overlaps with PDF parsing.
+    Returns the chunks and a normalized (len(chunks), EMBED_DIM) float32 matrix in input order.
+    """
+    all_chunks = []
+    futures = []
+
+    with ThreadPoolExecutor(max_workers=EMBED_MAX_CONCURRENCY) as executor:
+        for batch in iter_batches(chunks):
+            futures.append((len(all_chunks), executor.submit(_embed_batch_request, batch)))
+            all_chunks.extend(batch)
+
+        vectors = np.empty((len(all_chunks), EMBED_DIM), dtype=np.float32)
+        for start, future in futures:
+            batch_vectors = future.result()
+            vectors[start:start + len(batch_vectors)] = batch_vectors
+
+    return all_chunks, normalize_vectors(vectors)
+
+
+def embed_texts(chunks: List[str]) -> np.ndarray:
+    """
+    Embed a list of chunks. Returns a normalized (len(chunks), EMBED_DIM) float32 matrix.
+    """
+    return embed_chunks(chunks)[1]
+
+
+def _forget_pdf(pdf_id: str):
+    """Drop a PDF from this worker's in-memory view."""
+    pdf_indexes.pop(pdf_id, None)
+    pdf_index_versions.pop(pdf_id, None)
+    for vid in pdf_vector_ids.pop(pdf_id, []):
+        metadata_store.pop(vid, None)
+
+
+def _get_pdf_index(pdf_id: str):
+    """
+    Return the PDF's index, loading it from the persistent store if this worker
+    has not seen it yet. Returns None if the PDF is not stored.
+    """
+    version = vector_store.partition_version(pdf_id)
+    if pdf_id in pdf_indexes:
+        if version == pdf_index_versions.get(pdf_id):
+            return pdf_indexes[pdf_id]
+        # Another worker deleted, appended to or rebuilt the PDF since we loaded it
+        _forget_pdf(pdf_id)
+
+    if version is None:
+        return None
+    pdf_index, metadata = vector_store.load_partition(pdf_id)
+    if pdf_index is None:
+        return None
+
+    pdf_indexes[pdf_id] = pdf_index
+    pdf_index_versions[pdf_id] = version
+    metadata_store.update(metadata)
+    pdf_vector_ids[pdf_id] = list(metadata.keys())
+    return pdf_index
+
+
+def store_embeddings(pdf_id: str, chunks: Iterable) -> List[str]:
     """
-    Embed chunks, store in FAISS index and metadata_store.
+    Embed chunks, store in FAISS index and metadata_store, and append them to
+    the persistent vector store. `chunks` can be a list or a lazy iterator of
+    strings, or of dicts from pdf_utils.iter_token_chunks whose page/char-offset
+    provenance is stored alongside the text.
     Returns list of chunk UUIDs.
     """
-    global vector_id_counter
     chunk_ids = []
-    vectors = []
-    ids = []
-
+    provenance = []
+
+    def chunk_texts():
+        for chunk in chunks:
+            if isinstance(chunk, dict):
+                provenance.append({key: value for key, value in chunk.items() if key != "text"})
+                # The chunker already counted its tokens; don't tokenize the text again
+                yield (chunk["text"], chunk["token_count"]) if "token_count" in chunk else chunk["text"]
+            else:
+                provenance.append({})
+                yield chunk
+
+    chunks, vectors_np = embed_chunks(chunk_texts())
+    if not chunks:
+        return chunk_ids
+
+    start_id = vector_store.allocate_ids(len(chunks))
+    ids = np.arange(start_id, start_id + len(chunks), dtype=np.int64)
+
+    new_metadata = {}
     for idx, chunk in enumerate(chunks):
         chunk_id = str(uuid.uuid4())
-        vector = embed_text(chunk)
-        vectors.append(vector)
-        ids.append(vector_id_counter)
-
-        metadata_store[vector_id_counter] = {
+        new_metadata[int(ids[idx])] = {
             "chunk_id": chunk_id,
             "pdf_id": pdf_id,
             "chunk_index": idx,
             "text": chunk,
+            **provenance[idx],
         }
         chunk_ids.append(chunk_id)
-        vector_id_counter += 1
 
-    vectors_np = np.vstack(vectors)
-    index.add(vectors_np)  # Add batch vectors to FAISS index
+    # Build the PDF's FAISS index; the backend (flat or ANN) depends on the partition size.
+    # Loaded partitions are read-only memory maps, so appending rebuilds from their vectors.
+    existing_index = _get_pdf_index(pdf_id)
+    if existing_index is not None:
+        existing_vectors, existing_ids = index_vectors(existing_index)
+        vectors_np = np.vstack([existing_vectors, vectors_np])
+        ids = np.concatenate([existing_ids, ids])
+    pdf_index = build_index(vectors_np, ids)
+
+    vector_store.save_partition(pdf_id, pdf_index, new_metadata)
+
+    pdf_indexes[pdf_id] = pdf_index
+    pdf_index_versions[pdf_id] = vector_store.partition_version(pdf_id)
+    metadata_store.update(new_metadata)
+    pdf_vector_ids.setdefault(pdf_id, []).extend(new_metadata.keys())
 
     return chunk_ids
 
+
+def rebuild_pdf_index(pdf_id: str, backend: str = None):
+    """
+    Rebuild (and retrain) a PDF's index, e.g. after changing INDEX_BACKEND or
+    ANN_THRESHOLD. backend=None picks the backend from the partition size.
+    """
+    pdf_index = _get_pdf_index(pdf_id)
+    if pdf_index is None:
+        return
+
+    vectors, ids = index_vectors(pdf_index)
+    pdf_index = build_index(vectors, ids, backend)
+    vector_store.save_partition(pdf_id, pdf_index, {})
+    pdf_indexes[pdf_id] = pdf_index
+    pdf_index_versions[pdf_id] = vector_store.partition_version(pdf_id)
+
+
 def query_embeddings(pdf_id: str, query_text: str, top_k=3) -> List[Dict]:
     """
     Query top_k most similar chunks from the given PDF using FAISS.
+    Only the PDF's own index is searched, so top_k results are always returned
+    (exact for flat partitions, approximate for HNSW/IVF-PQ ones).
     Returns list of metadata dicts.
     """
-    if index.ntotal == 0:
+    pdf_index = _get_pdf_index(pdf_id)
+    if pdf_index is None or pdf_index.ntotal == 0:
         return []
 
-    query_vector = embed_text(query_text).reshape(1, -1)
+    query_vector = embed_query(query_text).reshape(1, -1)
 
     # Search for top_k vectors
-    D, I = index.search(query_vector, top_k * 5)  # Search more to filter by pdf_id
+    D, I = pdf_index.search(query_vector, min(top_k, pdf_index.ntotal))
 
     results = []
     for idx in I[0]:
         if idx == -1:
             continue
-        meta = metadata_store.get(idx)
-        if meta and meta['pdf_id'] == pdf_id:
+        meta = metadata_store.get(int(idx))
+        if meta:
             results.append(meta)
-            if len(results) >= top_k:
-                break
 
     return results
 
 
-def generate_answer(question: str, context_chunks: List[str]) -> str:
+def _answer_messages(question: str, context_chunks: List[str]) -> List[Dict]:
     system_prompt = "You are an AI assistant helping to answer questions based on the provided document excerpts."
     context_text = "\n\n---\n\n".join(context_chunks)
     user_prompt = (
@@ -155,42 +366,117 @@ def generate_answer(question: str, context_chunks: List[str]) -> str:
         f"Question: {question}\n\n"
         f"Answer:"
     )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
 
+
+def generate_answer(question: str, context_chunks: List[str], pdf_id: str = None, chunk_ids: List[str] = None) -> str:
+    """
+    Answer the question from the context chunks with GPT-4.
+    When pdf_id and the retrieved chunk_ids are given, the answer is cached and
+    reused for the same (normalized) question over the same chunks.
+    """
+    cache_key = None
+    if pdf_id is not None and chunk_ids is not None:
+        cache_key = answer_cache_key(pdf_id, question, chunk_ids)
+        cached = answer_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    start = time.perf_counter()
     response = openai.chat.completions.create(
         model="gpt-4",  # or "gpt-3.5-turbo"
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
+        messages=_answer_messages(question, context_chunks),
         max_tokens=500,
         temperature=0.2,
     )
-    return response.choices[0].message.content.strip()
+    answer = response.choices[0].message.content.strip()
 
+    if cache_key is not None:
+        cache_answer(cache_key, answer, time.perf_counter() - start)
+    return answer
 
-def delete_vectors_by_pdf_id(pdf_id: str):
+
+def generate_answer_stream(question: str, context_chunks: List[str], pdf_id: str = None, chunk_ids: List[str] = None):
     """
-    Deletes all vectors & metadata related to the given pdf_id.
-    Note: FAISS does not support deletion in IndexFlatIP, so
-    we'll recreate index excluding those vectors.
+    Streaming variant of generate_answer: yields answer text pieces as GPT-4 produces them.
+    A cached answer is yielded in one piece; a fully streamed answer is added to the cache.
+    """
+    cache_key = None
+    if pdf_id is not None and chunk_ids is not None:
+        cache_key = answer_cache_key(pdf_id, question, chunk_ids)
+        cached = answer_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    start = time.perf_counter()
+    stream = openai.chat.completions.create(
+        model="gpt-4",
+        messages=_answer_messages(question, context_chunks),
+        max_tokens=500,
+        temperature=0.2,
+        stream=True,
+    )
+
+    pieces = []
+    for event in stream:
+        if not event.choices:
+            continue
+        delta = event.choices[0].delta.content
+        if delta:
+            pieces.append(delta)
+            yield delta
+
+    if cache_key is not None:
+        cache_answer(cache_key, "".join(pieces).strip(), time.perf_counter() - start)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_answer_sse(pdf_id: str, question: str, top_k=3):
+    """
+    Server-Sent Events stream for PDF Q&A. Emits a `sources` event with the
+    retrieved chunks first, then one `token` event per answer piece, then `done`.
+    Use with StreamingResponse(..., media_type="text/event-stream").
     """
-    global index, metadata_store, vector_id_counter
+    results = query_embeddings(pdf_id, question, top_k)
+    if not results:
+        yield _sse("error", {"detail": "No content found for this PDF."})
+        return
 
-    # Filter vectors to keep (exclude pdf_id)
-    keep_ids = [vid for vid, meta in metadata_store.items() if meta['pdf_id'] != pdf_id]
-    new_metadata_store = {vid: metadata_store[vid] for vid in keep_ids}
+    chunk_ids = [meta["chunk_id"] for meta in results]
+    context_chunks = [meta["text"] for meta in results]
+    yield _sse("sources", {"chunk_ids": chunk_ids, "source_chunks": context_chunks})
 
-    # Extract corresponding vectors
-    vectors_to_keep = []
-    id_mapping = {}
-    for new_id, old_id in enumerate(keep_ids):
-        id_mapping[old_id] = new_id
-        vectors_to_keep.append(index.reconstruct(old_id))
+    try:
+        for piece in generate_answer_stream(question, context_chunks, pdf_id, chunk_ids):
+            yield _sse("token", {"text": piece})
+    except Exception as e:
+        yield _sse("error", {"detail": str(e)})
+        return
 
-    # Create new index
-    index = faiss.IndexFlatIP(EMBED_DIM)
-    if vectors_to_keep:
-        index.add(np.vstack(vectors_to_keep).astype(np.float32))
+    yield _sse("done", {})
 
-    metadata_store = new_metadata_store
-    vector_id_counter = len(metadata_store)
+def delete_vectors_by_pdf_id(pdf_id: str):
+    """
+    Deletes all vectors & metadata related to the given pdf_id.
+    The PDF's index partition is dropped and only its own metadata entries are
+    removed, so the cost depends on the document size, not the corpus size.
+    Vector IDs of other PDFs are stable.
+    """
+    delete_vectors_by_pdf_ids([pdf_id])
+
+
+def delete_vectors_by_pdf_ids(pdf_ids: List[str]):
+    """
+    Batched delete for the cleanup sweep: removes every given PDF in one pass.
+    """
+    for pdf_id in pdf_ids:
+        _forget_pdf(pdf_id)
+        invalidate_pdf_answers(pdf_id)
+    vector_store.delete_partitions(pdf_ids)
@@ -0,0 +1,96 @@
+import math
+import faiss
+import numpy as np
+from .config import (
+    INDEX_BACKEND,
+    ANN_THRESHOLD,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    IVFPQ_SUBQUANTIZERS,
+    IVFPQ_NPROBE,
+    IVFPQ_MIN_TRAINING_POINTS,
+)
+
+# Index backends for a PDF partition. All of them are wrapped in IndexIDMap2 so
+# vectors keep their global vector IDs. See the README for the memory/latency trade-offs.
+BACKENDS = ("flat", "hnsw", "ivfpq")
+
+
+def choose_backend(num_vectors: int) -> str:
+    """
+    Pick the backend for a partition of `num_vectors` vectors.
+    With INDEX_BACKEND = "auto", exact search is used below ANN_THRESHOLD and HNSW above it.
+    """
+    if INDEX_BACKEND != "auto":
+        return INDEX_BACKEND
+    return "flat" if num_vectors < ANN_THRESHOLD else "hnsw"
+
+
+def _ivf_nlist(num_vectors: int) -> int:
+    # ~4 * sqrt(n) lists, keeping at least 39 training points per list
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+
+
+def _ivfpq_trainable(num_vectors: int) -> bool:
+    """PQ training needs a point per centroid, and IVF ~39 points per list."""
+    return num_vectors >= max(IVFPQ_MIN_TRAINING_POINTS, 39 * _ivf_nlist(num_vectors))
+
+
+def build_index(vectors: np.ndarray, ids: np.ndarray, backend: str = None):
+    """
+    Build (and train, where needed) an index over normalized vectors.
+    Inner product on normalized vectors is cosine similarity.
+    """
+    dim = vectors.shape[1]
+    backend = backend or choose_backend(len(vectors))
+    if backend == "ivfpq" and not _ivfpq_trainable(len(vectors)):
+        # Too few vectors to train the quantizers; exact search is cheap at this size anyway
+        backend = "flat"
+
+    if backend == "flat":
+        inner = faiss.IndexFlatIP(dim)
+    elif backend == "hnsw":
+        inner = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        inner.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        inner.hnsw.efSearch = HNSW_EF_SEARCH
+    elif backend == "ivfpq":
+        nlist = _ivf_nlist(len(vectors))
+        quantizer = faiss.IndexFlatIP(dim)
+        inner = faiss.IndexIVFPQ(quantizer, dim, nlist, IVFPQ_SUBQUANTIZERS, 8, faiss.METRIC_INNER_PRODUCT)
+        inner.train(vectors)
+        inner.nprobe = min(IVFPQ_NPROBE, nlist)
+    else:
+        raise ValueError(f"Unknown index backend '{backend}'. Expected one of {BACKENDS}")
+
+    index = faiss.IndexIDMap2(inner)
+    index.add_with_ids(vectors, ids)
+    return index
+
+
+def index_vectors(index):
+    """
+    Return (vectors, ids) stored in an IndexIDMap2 partition, used to rebuild it
+    with another backend. Vectors read back from an IVF-PQ index are approximate.
+    """
+    ids = faiss.vector_to_array(index.id_map).astype(np.int64)
+    inner = faiss.downcast_index(index.index)
+    if isinstance(inner, faiss.IndexIVF):
+        inner.make_direct_map()
+    vectors = inner.reconstruct_n(0, index.ntotal).astype(np.float32)
+    return vectors, ids
+
+
+def recall_at_k(vectors: np.ndarray, queries: np.ndarray, k: int = 10, backend: str = "hnsw") -> float:
+    """
+    Fraction of the exact (flat) top-k neighbours that `backend` also returns,
+    averaged over `queries`.
+    """
+    ids = np.arange(len(vectors), dtype=np.int64)
+    k = min(k, len(vectors))
+
+    _, exact = build_index(vectors, ids, "flat").search(queries, k)
+    _, approx = build_index(vectors, ids, backend).search(queries, k)
+
+    hits = sum(len(set(e) & set(a)) for e, a in zip(exact, approx))
+    return hits / (len(queries) * k)
@@ -1,23 +1,136 @@
-import fitz  # PyMuPDF
+import tiktoken
+from typing import Iterable, Iterator
+from pdf_pages import iter_pdf_pages
+from .config import (
+    CHUNK_MAX_TOKENS,
+    CHUNK_OVERLAP_TOKENS,
+    CHUNK_MIN_TOKENS,
+)
+
+# Tokenizer used by text-embedding-ada-002, loaded on first use (tiktoken may
+# download its BPE file, which shouldn't happen at import time)
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
 
 def extract_text_from_pdf(pdf_path: str) -> list[str]:
     """
     Extracts text by pages and returns list of page texts.
     """
-    doc = fitz.open(pdf_path)
-    pages = []
-    for page in doc:
-        pages.append(page.get_text())
-    return pages
+    return list(iter_pdf_pages(pdf_path))
 
-def chunk_text(pages: list[str], max_chunk_size=500) -> list[str]:
+
+def iter_chunks(pages: Iterable[str], max_chunk_size=500) -> Iterator[str]:
     """
-    Simple chunking: split page text into chunks of max_chunk_size words.
+    Incremental version of chunk_text: yields each chunk as soon as its page is available.
     """
-    chunks = []
     for page_text in pages:
         words = page_text.split()
         for i in range(0, len(words), max_chunk_size):
-            chunk = " ".join(words[i:i+max_chunk_size])
-            chunks.append(chunk)
-    return chunks
+            yield " ".join(words[i:i+max_chunk_size])
+
+
+def chunk_text(pages: list[str], max_chunk_size=500) -> list[str]:
+    """
+    Simple chunking: split page text into chunks of max_chunk_size words.
+    """
+    return list(iter_chunks(pages, max_chunk_size))
+
+
+def count_tokens(text: str) -> int:
+    return len(_get_encoding().encode(text, disallowed_special=()))
+
+
+def _make_chunk(buffer, page_texts) -> dict:
+    """
+    Build a chunk dict from (token, page_num, char_start, char_end) entries.
+    Page numbers are 0-based; char offsets are relative to their page's text.
+    The text is sliced from the pages by those offsets rather than decoded from the
+    tokens, since a token slice can start or end inside a multi-byte character.
+    """
+    page_start, page_end = buffer[0][1], buffer[-1][1]
+    char_start, char_end = buffer[0][2], buffer[-1][3]
+    if page_start == page_end:
+        text = page_texts[page_start][char_start:char_end]
+    else:
+        parts = [page_texts[page_start][char_start:]]
+        parts.extend(page_texts.get(page_num, "") for page_num in range(page_start + 1, page_end))
+        parts.append(page_texts[page_end][:char_end])
+        text = "".join(parts)
+    return {
+        "text": text,
+        "page_start": page_start,
+        "page_end": page_end,
+        "char_start": char_start,
+        "char_end": char_end,
+        "token_count": len(buffer),
+    }
+
+
+def iter_token_chunks(
+    pages: Iterable[str],
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    min_tokens: int = CHUNK_MIN_TOKENS,
+) -> Iterator[dict]:
+    """
+    Token-budgeted chunker. Treats the document as one token stream, so chunks can
+    span page boundaries, and consecutive chunks share `overlap_tokens` tokens.
+    A final tail with fewer than `min_tokens` new tokens is not emitted as a tiny chunk
+    of its own: it is merged with the previous chunk and the result split evenly into
+    two chunks, so no chunk ever exceeds `max_tokens`.
+    Yields dicts with the chunk text and its page/char-offset provenance.
+    """
+    step = max_tokens - overlap_tokens
+    if step <= 0:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+    if min_tokens + overlap_tokens > max_tokens:
+        raise ValueError("min_tokens + overlap_tokens must not exceed max_tokens")
+    encoding = _get_encoding()
+
+    buffer = []  # (token, page_num, char_start, char_end)
+    new_tokens = 0  # Tokens in buffer not already emitted as overlap
+    pending = None  # Entries of the last chunk, held back in case the final tail is merged into it
+    page_texts = {}  # Text of the pages still referenced by buffer or pending
+
+    for page_num, page_text in enumerate(pages):
+        tokens = encoding.encode(page_text, disallowed_special=())
+        if not tokens:
+            continue
+        page_texts[page_num] = page_text
+        _, offsets = encoding.decode_with_offsets(tokens)
+        ends = offsets[1:] + [len(page_text)]
+        buffer.extend(zip(tokens, [page_num] * len(tokens), offsets, ends))
+        new_tokens += len(tokens)
+
+        while len(buffer) >= max_tokens:
+            if pending is not None:
+                yield _make_chunk(pending, page_texts)
+            pending = buffer[:max_tokens]
+            buffer = buffer[step:]
+            new_tokens = len(buffer) - overlap_tokens
+
+        oldest_page = pending[0][1] if pending else buffer[0][1] if buffer else page_num
+        for old_page in [p for p in page_texts if p < oldest_page]:
+            del page_texts[old_page]
+
+    if new_tokens > 0:
+        if pending is not None and new_tokens < min_tokens:
+            # Rebalance the previous chunk and the short tail into two chunks
+            merged = pending + buffer[-new_tokens:]
+            split = (len(merged) + overlap_tokens + 1) // 2
+            yield _make_chunk(merged[:split], page_texts)
+            pending = merged[split - overlap_tokens:]
+        else:
+            if pending is not None:
+                yield _make_chunk(pending, page_texts)
+            pending = buffer
+
+    if pending is not None:
+        yield _make_chunk(pending, page_texts)
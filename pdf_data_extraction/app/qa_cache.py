@@ -0,0 +1,111 @@
+import re
+import threading
+from collections import OrderedDict
+from .config import QUERY_EMBED_CACHE_SIZE, ANSWER_CACHE_SIZE
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase and collapse whitespace so trivially different phrasings share cache entries."""
+    return re.sub(r"\s+", " ", question).strip().lower()
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache that also tracks how much time its hits saved,
+    based on the average latency of the misses it has seen.
+    """
+
+    def __init__(self, max_size: int, on_evict=None):
+        self.max_size = max_size
+        self.on_evict = on_evict  # Called with each key dropped to stay under max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._miss_seconds = 0.0
+        self.seconds_saved = 0.0
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            if self.misses:
+                self.seconds_saved += self._miss_seconds / self.misses
+            return self._data[key]
+
+    def put(self, key, value, elapsed_seconds: float = 0.0):
+        """Store a value computed after a miss, recording how long it took."""
+        with self._lock:
+            self._miss_seconds += elapsed_seconds
+            self._data[key] = value
+            self._data.move_to_end(key)
+            evicted = []
+            while len(self._data) > self.max_size:
+                evicted.append(self._data.popitem(last=False)[0])
+        if self.on_evict:
+            for key in evicted:
+                self.on_evict(key)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "seconds_saved": round(self.seconds_saved, 3),
+        }
+
+
+# Level 1: normalized question text -> normalized query embedding
+query_embedding_cache = LRUCache(QUERY_EMBED_CACHE_SIZE)
+
+# Level 2: (pdf_id, normalized question, retrieved chunk IDs) -> answer
+_answer_keys_by_pdf = {}  # Map pdf_id to its answer cache keys, for invalidation
+_answer_keys_lock = threading.Lock()
+
+
+def _forget_answer_key(key):
+    """Drop an evicted answer's key so the per-PDF index doesn't grow without bound."""
+    with _answer_keys_lock:
+        keys = _answer_keys_by_pdf.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del _answer_keys_by_pdf[key[0]]
+
+
+answer_cache = LRUCache(ANSWER_CACHE_SIZE, on_evict=_forget_answer_key)
+
+
+def answer_cache_key(pdf_id: str, question: str, chunk_ids):
+    return (pdf_id, normalize_question(question), tuple(chunk_ids))
+
+
+def cache_answer(key, answer: str, elapsed_seconds: float):
+    # Register the key first so an immediate eviction of it is also forgotten
+    with _answer_keys_lock:
+        _answer_keys_by_pdf.setdefault(key[0], set()).add(key)
+    answer_cache.put(key, answer, elapsed_seconds)
+
+
+def invalidate_pdf_answers(pdf_id: str):
+    """Drop every cached answer for a PDF; called when its vectors are deleted."""
+    with _answer_keys_lock:
+        keys = _answer_keys_by_pdf.pop(pdf_id, set())
+    for key in keys:
+        answer_cache.pop(key)
+
+
+def get_cache_stats() -> dict:
+    return {
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+    }
@@ -0,0 +1,166 @@
+import os
+import json
+import sqlite3
+import threading
+import faiss
+from .config import VECTOR_STORE_DIR
+
+# On-disk layout:
+#   VECTOR_STORE_DIR/indexes/<pdf_id>.faiss  one FAISS index per PDF
+#   VECTOR_STORE_DIR/metadata.db             chunk metadata and the vector ID counter (SQLite)
+#
+# Index files are loaded with IO_FLAG_MMAP_IFC (faiss >= 1.10), which maps the
+# flat vector codes straight from the file, so every uvicorn worker shares the
+# same read-only page cache for flat partitions and for the vector storage of
+# HNSW ones. The HNSW graph, the ID map and IVF-PQ codes (96 bytes per vector)
+# are still read into each worker's memory. With older faiss versions the whole
+# index is read into memory.
+#
+# Index files are never modified in place: appending to a PDF or rebuilding its
+# index writes a new file and os.replace()s it over the old one. Workers that
+# still have the old file mapped keep reading the old (unlinked) inode until
+# they notice the new version (see partition_version) and reload.
+
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+
+INDEX_DIR = os.path.join(VECTOR_STORE_DIR, "indexes")
+METADATA_DB_PATH = os.path.join(VECTOR_STORE_DIR, "metadata.db")
+os.makedirs(INDEX_DIR, exist_ok=True)
+
+# Metadata keys stored in their own columns; any other keys go into the provenance JSON
+CHUNK_COLUMNS = ("pdf_id", "chunk_id", "chunk_index", "text")
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(METADATA_DB_PATH, check_same_thread=False, timeout=30)
+        # WAL lets other workers keep reading while one worker appends
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "vector_id INTEGER PRIMARY KEY, pdf_id TEXT NOT NULL, chunk_id TEXT NOT NULL, "
+            "chunk_index INTEGER NOT NULL, text TEXT NOT NULL)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_pdf_id ON chunks (pdf_id)")
+        # Page/char-offset provenance (JSON), added after the first release of this schema
+        columns = [row[1] for row in _conn.execute("PRAGMA table_info(chunks)")]
+        if "provenance" not in columns:
+            _conn.execute("ALTER TABLE chunks ADD COLUMN provenance TEXT")
+        _conn.execute("CREATE TABLE IF NOT EXISTS id_counter (next_id INTEGER NOT NULL)")
+        if _conn.execute("SELECT COUNT(*) FROM id_counter").fetchone()[0] == 0:
+            _conn.execute("INSERT INTO id_counter (next_id) VALUES (0)")
+        _conn.commit()
+    return _conn
+
+
+def _index_path(pdf_id: str) -> str:
+    return os.path.join(INDEX_DIR, f"{os.path.basename(pdf_id)}.faiss")
+
+
+def allocate_ids(count: int) -> int:
+    """
+    Reserve `count` consecutive vector IDs shared across all workers.
+    Returns the first reserved ID.
+    """
+    with _lock:
+        conn = _get_conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            start = conn.execute("SELECT next_id FROM id_counter").fetchone()[0]
+            conn.execute("UPDATE id_counter SET next_id = ?", (start + count,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return start
+
+
+def save_partition(pdf_id: str, index, metadata: dict):
+    """
+    Write a PDF's index file and add its (new) metadata rows.
+    The index is written to a temp file and renamed over the old one, so readers
+    never see a partial file and existing memory maps stay valid.
+    """
+    path = _index_path(pdf_id)
+    tmp_path = f"{path}.tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+    rows = [
+        (
+            vid, meta["pdf_id"], meta["chunk_id"], meta["chunk_index"], meta["text"],
+            json.dumps({key: value for key, value in meta.items() if key not in CHUNK_COLUMNS}),
+        )
+        for vid, meta in metadata.items()
+    ]
+    with _lock:
+        conn = _get_conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO chunks (vector_id, pdf_id, chunk_id, chunk_index, text, provenance) VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        conn.commit()
+
+
+def partition_exists(pdf_id: str) -> bool:
+    return os.path.exists(_index_path(pdf_id))
+
+
+def partition_version(pdf_id: str):
+    """
+    Identify the current index file of a PDF; changes whenever the file is replaced.
+    Returns None if the PDF is not stored.
+    """
+    try:
+        stat = os.stat(_index_path(pdf_id))
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+def load_partition(pdf_id: str):
+    """
+    Memory-map a PDF's index and load its metadata.
+    Returns (index, {vector_id: metadata}) or (None, {}) if the PDF is not stored.
+    """
+    path = _index_path(pdf_id)
+    if not os.path.exists(path):
+        return None, {}
+
+    index = faiss.read_index(path, MMAP_FLAGS)
+
+    with _lock:
+        rows = _get_conn().execute(
+            "SELECT vector_id, chunk_id, chunk_index, text, provenance FROM chunks WHERE pdf_id = ?",
+            (pdf_id,)
+        ).fetchall()
+
+    metadata = {
+        vector_id: {
+            "chunk_id": chunk_id,
+            "pdf_id": pdf_id,
+            "chunk_index": chunk_index,
+            "text": text,
+            **json.loads(provenance or "{}"),
+        }
+        for vector_id, chunk_id, chunk_index, text, provenance in rows
+    }
+    return index, metadata
+
+
+def delete_partitions(pdf_ids):
+    """Remove the index files and metadata rows of the given PDFs in one transaction."""
+    for pdf_id in pdf_ids:
+        try:
+            os.remove(_index_path(pdf_id))
+        except FileNotFoundError:
+            pass
+
+    with _lock:
+        conn = _get_conn()
+        conn.executemany("DELETE FROM chunks WHERE pdf_id = ?", [(pdf_id,) for pdf_id in pdf_ids])
+        conn.commit()
@@ -0,0 +1,52 @@
+import os
+import fitz  # PyMuPDF
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+
+# Page text extraction shared by the PDF services (pdf_data_extraction, summarizer),
+# so the process uses a single extraction pool however many services are mounted.
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", os.cpu_count() or 1))  # Processes used for page-parallel extraction
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))  # Pages extracted per process pool task
+
+# Shared process pool for page extraction (PyMuPDF is CPU-bound and holds the GIL)
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS)
+    return _executor
+
+
+def _extract_page_range(args) -> list[str]:
+    """
+    Worker task: extract text for pages [start, end) of a PDF.
+    """
+    pdf_path, start, end = args
+    with fitz.open(pdf_path) as doc:
+        return [doc[page_num].get_text() for page_num in range(start, end)]
+
+
+def iter_pdf_pages(pdf_path: str, parallel: bool = None) -> Iterator[str]:
+    """
+    Lazily yield the text of each page in order.
+    With parallel extraction, page ranges are fanned out across the process pool
+    and yielded in order as they complete.
+    """
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+        if parallel is None:
+            parallel = PDF_EXTRACT_WORKERS > 1 and page_count > PDF_PAGES_PER_TASK
+        if not parallel:
+            for page in doc:
+                yield page.get_text()
+            return
+
+    tasks = [
+        (pdf_path, start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    ]
+    # map() returns results in submission order while later ranges are still being parsed
+    for page_texts in _get_executor().map(_extract_page_range, tasks):
+        yield from page_texts
@@ -0,0 +1,93 @@
+from .image_preprocess import prepare_image
+from .result_cache import cached_analyzer
+from .schemas import FullGrainReport
+from .structured_output import generate_structured, StructuredOutputError
+
+# Keys of the merged response, one per single-purpose grain analyzer
+REPORT_SECTIONS = [
+    "grain_analysis",
+    "quality_analysis",
+    "variety_identification",
+    "commodity_classification",
+]
+
+prompt = """Analyze the provided image of a grain sample and produce a complete intake report in a single response.
+
+Tasks:
+1. Grain analysis: detect and count the grains visible in the image, classify them (whole, broken, discolored) with counts and percentages, and list any visible defects or abnormalities.
+2. Quality analysis: do not focus on grain count. Rate the overall quality (Excellent, Good, Fair, Poor), give the percentage of each quality category, list common quality issues observed (e.g., broken, discolored, chalky, shriveled grains) and give short recommendations to improve quality.
+3. Variety identification: identify the rice variety (e.g., Basmati, Jasmine, Sona Masoori, Arborio, Brown rice, Wild rice, Parboiled rice), give a confidence level (%), list the top 3 possible varieties with confidence levels and the distinguishing features used.
+4. Commodity classification: identify the primary commodity (e.g., Rice, Dal/Lentils, Corn, Wheat, Barley, Pulses, Seeds, Other), give a confidence score (%), list the top 3 possible classes with confidence levels and the visual features used.
+
+Return response strictly in JSON format:
+{
+    "grain_analysis": {
+        "total_grains": number,
+        "grain_quality": {
+            "whole_grains": {"count": number, "percentage": number},
+            "broken_grains": {"count": number, "percentage": number},
+            "discolored_grains": {"count": number, "percentage": number}
+        },
+        "defects": [list of any detected defects],
+        "analysis_summary": "brief text summary of the overall grain quality"
+    },
+    "quality_analysis": {
+        "overall_quality": "Excellent | Good | Fair | Poor",
+        "quality_distribution": {
+            "excellent": {"percentage": number},
+            "good": {"percentage": number},
+            "fair": {"percentage": number},
+            "poor": {"percentage": number}
+        },
+        "issues_detected": [list of issues],
+        "recommendations": "short actionable advice"
+    },
+    "variety_identification": {
+        "predicted_variety": "Basmati | Jasmine | Sona Masoori | Arborio | Brown Rice | Wild Rice | Other",
+        "confidence": number,
+        "possible_varieties": [
+            {"variety": "name", "confidence": number},
+            {"variety": "name", "confidence": number},
+            {"variety": "name", "confidence": number}
+        ],
+        "features_used": "short explanation of key features observed"
+    },
+    "commodity_classification": {
+        "predicted_commodity": "Rice | Dal | Corn | Wheat | Barley | Pulses | Seeds | Other",
+        "confidence": number,
+        "possible_classes": [
+            {"commodity": "name", "confidence": number},
+            {"commodity": "name", "confidence": number},
+            {"commodity": "name", "confidence": number}
+        ],
+        "features_used": "short explanation of observed features"
+    }
+}
+"""
+
+def _error_report(error):
+    return {section: dict(error) for section in REPORT_SECTIONS}
+
+@cached_analyzer("generate_full_grain_report", prompt)
+async def generate_full_grain_report(image_bytes):
+    """
+    Run grain analysis, quality analysis, variety identification and commodity
+    classification on one image with a single Gemini call.
+    Returns a dict with one entry per section, each in the same shape as the
+    corresponding single-purpose analyzer's result.
+    """
+    try:
+        # Downscale and re-encode the image before upload
+        image = await prepare_image(image_bytes, "generate_full_grain_report")
+
+        # Request schema-constrained JSON and validate it
+        try:
+            result = await generate_structured([image, prompt], FullGrainReport, "generate_full_grain_report")
+        except StructuredOutputError as e:
+            return _error_report({"error": str(e), "raw_response": e.raw_response})
+
+        # Fan the merged result out into the four per-analyzer shapes
+        return {section: result[section] for section in REPORT_SECTIONS}
+
+    except Exception as e:
+        return _error_report({"error": f"Error generating grain report: {str(e)}"})
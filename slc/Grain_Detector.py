@@ -1,18 +1,7 @@
-from PIL import Image
-import os
-import json
-from dotenv import load_dotenv
-import google.generativeai as genai
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Initialize Gemini API client with API key from environment variables
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
-
-genai.configure(api_key=api_key)
+from .image_preprocess import prepare_image
+from .result_cache import cached_analyzer
+from .schemas import GrainAnalysis
+from .structured_output import generate_structured, StructuredOutputError
 
 prompt = """Analyze the provided image of rice grains. Detect and count the number of rice grains visible in the image. 
 Provide the following information:
@@ -34,33 +23,18 @@ Format the output as a JSON object with the following structure:
 }
 """
 
-def analyze_rice_image(image_path):
+@cached_analyzer("analyze_rice_image", prompt)
+async def analyze_rice_image(image_bytes):
     """Analyze rice grains in the provided image using Gemini API."""
     try:
-        # Open the image
-        image = Image.open(image_path)
-        response = genai.GenerativeModel("gemini-2.5-flash").generate_content(
-            [image, prompt]
-        )
-
-        # Clean the response text
-        cleaned_text = response.text.strip()
-
-        # Remove markdown code fences if present
-        if cleaned_text.startswith("```"):
-            cleaned_text = cleaned_text.strip("`")  # remove backticks
-            if cleaned_text.lower().startswith("json"):
-                cleaned_text = cleaned_text[4:].strip()
+        # Downscale and re-encode the image before upload
+        image = await prepare_image(image_bytes, "analyze_rice_image")
 
-        # Try parsing JSON
+        # Request schema-constrained JSON and validate it
         try:
-            result = json.loads(cleaned_text)
-            if isinstance(result, dict):
-                return result
-            else:
-                return {"error": "Unexpected response type", "raw_response": cleaned_text}
-        except json.JSONDecodeError:
-            return {"error": "Invalid JSON response", "raw_response": cleaned_text}
+            return await generate_structured([image, prompt], GrainAnalysis, "analyze_rice_image")
+        except StructuredOutputError as e:
+            return {"error": str(e), "raw_response": e.raw_response}
 
     except Exception as e:
         return {"error": f"Error analyzing image: {str(e)}"}
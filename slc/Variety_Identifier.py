@@ -1,16 +1,7 @@
-from PIL import Image
-import os
-import json
-from dotenv import load_dotenv
-import google.generativeai as genai
-
-# Load environment variables
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
-
-genai.configure(api_key=api_key)
+from .image_preprocess import prepare_image
+from .result_cache import cached_analyzer
+from .schemas import VarietyIdentification
+from .structured_output import generate_structured, StructuredOutputError
 
 prompt = """Identify the variety of rice in the provided image.  
 
@@ -33,31 +24,18 @@ Return response strictly in JSON:
 }
 """
 
-def identify_rice_variety(image_path):
+@cached_analyzer("identify_rice_variety", prompt)
+async def identify_rice_variety(image_bytes):
     """Identify rice variety using Gemini API."""
     try:
-        # Open image
-        image = Image.open(image_path)
-        response = genai.GenerativeModel("gemini-2.5-flash").generate_content(
-            [image, prompt]
-        )
-
-        # Clean response
-        cleaned_text = response.text.strip()
-        if cleaned_text.startswith("```"):
-            cleaned_text = cleaned_text.strip("`")
-            if cleaned_text.lower().startswith("json"):
-                cleaned_text = cleaned_text[4:].strip()
+        # Downscale and re-encode the image before upload
+        image = await prepare_image(image_bytes, "identify_rice_variety")
 
-        # Parse JSON
+        # Request schema-constrained JSON and validate it
         try:
-            result = json.loads(cleaned_text)
-            if isinstance(result, dict):
-                return result
-            else:
-                return {"error": "Unexpected response type", "raw_response": cleaned_text}
-        except json.JSONDecodeError:
-            return {"error": "Invalid JSON response", "raw_response": cleaned_text}
+            return await generate_structured([image, prompt], VarietyIdentification, "identify_rice_variety")
+        except StructuredOutputError as e:
+            return {"error": str(e), "raw_response": e.raw_response}
 
     except Exception as e:
         return {"error": f"Error identifying rice variety: {str(e)}"}
@@ -0,0 +1,71 @@
+import os
+import json
+import asyncio
+import zipfile
+from io import BytesIO
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Maximum number of images analysed at the same time within one batch request
+SLC_BATCH_CONCURRENCY = int(os.getenv("SLC_BATCH_CONCURRENCY", "8"))
+# Maximum number of images accepted in one batch request
+SLC_BATCH_MAX_IMAGES = int(os.getenv("SLC_BATCH_MAX_IMAGES", "100"))
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif", ".tif", ".tiff", ".heic")
+
+
+def extract_zip_images(zip_bytes: bytes, max_image_bytes: int):
+    """
+    Return a list of (filename, image_bytes) for every image file in a zip archive.
+    Entries larger than max_image_bytes (uncompressed) are rejected.
+    """
+    images = []
+    with zipfile.ZipFile(BytesIO(zip_bytes)) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            # Skip macOS resource fork entries
+            if os.path.basename(info.filename).startswith("._"):
+                continue
+            if info.file_size > max_image_bytes:
+                raise ValueError(f"{info.filename} exceeds the maximum size of {max_image_bytes} bytes")
+            images.append((info.filename, archive.read(info)))
+            if len(images) > SLC_BATCH_MAX_IMAGES:
+                raise ValueError(f"Too many images. Maximum is {SLC_BATCH_MAX_IMAGES} per batch")
+    return images
+
+
+async def run_batch(analyzer, images, concurrency: int = SLC_BATCH_CONCURRENCY):
+    """
+    Run an async slc analyzer over a list of (filename, image_bytes) with bounded
+    concurrency, yielding {"index", "filename", "result"} dicts in completion order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(index, filename, image_bytes):
+        async with semaphore:
+            try:
+                result = await analyzer(image_bytes)
+            except Exception as e:
+                result = {"error": str(e)}
+        return {"index": index, "filename": filename, "result": result}
+
+    tasks = [
+        asyncio.create_task(run_one(index, filename, image_bytes))
+        for index, (filename, image_bytes) in enumerate(images)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client disconnected or the stream was closed early
+        for task in tasks:
+            task.cancel()
+
+
+async def stream_batch_ndjson(analyzer, images, concurrency: int = SLC_BATCH_CONCURRENCY):
+    """Same as run_batch but yields one NDJSON line per finished image."""
+    async for item in run_batch(analyzer, images, concurrency):
+        yield json.dumps(item) + "\n"
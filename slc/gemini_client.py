@@ -0,0 +1,79 @@
+import os
+import asyncio
+from dotenv import load_dotenv
+from google import genai
+from google.genai.types import HttpOptions
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# Maximum number of in-flight requests per model
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+
+_client = None
+
+
+def get_client():
+    """
+    Return the shared Gemini client used by every slc analyzer.
+    Uses the Gemini API key by default; Vertex AI is an explicit opt-in via
+    GEMINI_USE_VERTEX=true (with GOOGLE_CLOUD_PROJECT set).
+    The client is created once, so all analyzers share its connection pool.
+    """
+    global _client
+    if _client is not None:
+        return _client
+
+    use_vertex = os.getenv("GEMINI_USE_VERTEX", "false").lower() in ("1", "true", "yes")
+    gcp_project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
+    api_key = os.getenv("GEMINI_API_KEY")
+
+    if use_vertex:
+        if not gcp_project_id:
+            raise ValueError("GEMINI_USE_VERTEX is set but GOOGLE_CLOUD_PROJECT is not set in environment variables")
+        _client = genai.Client(
+            vertexai=True,
+            project=gcp_project_id,
+            location="global",
+            http_options=HttpOptions(api_version="v1")
+        )
+    elif api_key:
+        _client = genai.Client(api_key=api_key)
+    else:
+        raise ValueError("GEMINI_API_KEY not found in environment variables (or set GEMINI_USE_VERTEX=true to use Vertex AI)")
+
+    return _client
+
+
+class GeminiModel:
+    """A registered model with its own bound on concurrent requests."""
+
+    def __init__(self, name: str, max_concurrency: int = GEMINI_MAX_CONCURRENCY):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def generate_content(self, contents, config=None):
+        async with self._semaphore:
+            return await get_client().aio.models.generate_content(
+                model=self.name,
+                contents=contents,
+                config=config
+            )
+
+
+# Model registry: one GeminiModel (and semaphore) per model name
+_models = {}
+
+
+def get_model(name: str = DEFAULT_MODEL) -> GeminiModel:
+    if name not in _models:
+        _models[name] = GeminiModel(name)
+    return _models[name]
+
+
+async def generate_content(contents, model: str = DEFAULT_MODEL, config=None):
+    """Run an async Gemini request through the shared client and model registry."""
+    return await get_model(model).generate_content(contents, config=config)
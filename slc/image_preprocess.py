@@ -0,0 +1,108 @@
+import os
+import asyncio
+from io import BytesIO
+from PIL import Image, ImageOps, ImageChops
+from dotenv import load_dotenv
+from google.genai import types
+
+# Load environment variables
+load_dotenv()
+
+# Set SLC_PREPROCESS_ENABLED=false to send original images to Gemini
+SLC_PREPROCESS_ENABLED = os.getenv("SLC_PREPROCESS_ENABLED", "true").lower() == "true"
+
+# Default settings for visual classification tasks (grain count, quality, variety, commodity)
+DEFAULT_PREPROCESS = {
+    "max_side": 1536,  # Longest side in pixels after downscaling
+    "format": "JPEG",  # JPEG or WEBP
+    "quality": 85,
+    "crop_to_content": False,
+}
+
+# OCR tasks need more pixels and less compression to keep characters legible
+OCR_PREPROCESS = {
+    "max_side": 2560,
+    "format": "JPEG",
+    "quality": 92,
+    "crop_to_content": False,
+}
+
+# Per-analyzer settings; analyzers not listed use DEFAULT_PREPROCESS
+ANALYZER_PREPROCESS = {
+    "extract_invoice_entities": OCR_PREPROCESS,
+    "extract_number_plate": OCR_PREPROCESS,
+    "detect_weigh_bridge_slip": OCR_PREPROCESS,
+    "count_bags": OCR_PREPROCESS,
+}
+
+MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+}
+
+# Pixels whose difference from the background is below this are treated as background
+CROP_THRESHOLD = 20
+CROP_PADDING = 16
+
+
+def get_preprocess_config(analyzer: str) -> dict:
+    return {**DEFAULT_PREPROCESS, **ANALYZER_PREPROCESS.get(analyzer, {})}
+
+
+def set_preprocess_config(analyzer: str, **overrides):
+    """Override preprocessing settings for one analyzer, e.g. set_preprocess_config("classify_commodity", max_side=1024)."""
+    ANALYZER_PREPROCESS[analyzer] = {**get_preprocess_config(analyzer), **overrides}
+
+
+def _crop_to_content(image: Image.Image) -> Image.Image:
+    """Crop away a uniform border, using the top-left pixel as the background colour."""
+    background = Image.new(image.mode, image.size, image.getpixel((0, 0)))
+    diff = ImageChops.difference(image, background).convert("L")
+    bbox = diff.point(lambda p: 255 if p > CROP_THRESHOLD else 0).getbbox()
+    if not bbox:
+        return image
+    left, top, right, bottom = bbox
+    return image.crop((
+        max(left - CROP_PADDING, 0),
+        max(top - CROP_PADDING, 0),
+        min(right + CROP_PADDING, image.width),
+        min(bottom + CROP_PADDING, image.height),
+    ))
+
+
+def preprocess_image(image_bytes: bytes, config: dict) -> bytes:
+    """
+    Fix EXIF orientation, optionally crop to content, downscale so the longest side
+    is at most config["max_side"] and re-encode at config["quality"].
+    Returns the encoded image bytes.
+    """
+    image = Image.open(BytesIO(image_bytes))
+    image = ImageOps.exif_transpose(image)
+
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    if config["crop_to_content"]:
+        image = _crop_to_content(image)
+
+    # thumbnail() keeps the aspect ratio and never upscales
+    max_side = config["max_side"]
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    output = BytesIO()
+    image.save(output, format=config["format"], quality=config["quality"], optimize=True)
+    return output.getvalue()
+
+
+async def prepare_image(image_bytes: bytes, analyzer: str):
+    """
+    Build the image part sent to Gemini for the given analyzer.
+    Preprocessing is CPU-bound, so it runs in a worker thread.
+    """
+    if not SLC_PREPROCESS_ENABLED:
+        return Image.open(BytesIO(image_bytes))
+
+    config = get_preprocess_config(analyzer)
+    data = await asyncio.to_thread(preprocess_image, image_bytes, config)
+    return types.Part.from_bytes(data=data, mime_type=MIME_TYPES[config["format"]])
@@ -1,55 +1,39 @@
-from PIL import Image
-from google import genai
-import os
-from google.genai.types import HttpOptions
-from io import BytesIO
+from .image_preprocess import prepare_image
+from .result_cache import cached_analyzer
+from .schemas import InvoiceEntities
+from .structured_output import generate_structured, StructuredOutputError
 
-try:
-    gcp_project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
-    gcp_location = "global"
-    
-    if not gcp_project_id:
-        raise ValueError("GCP_PROJECT_ID environment variable not set.")
-    
-    client = genai.Client(
-        vertexai=True,
-        project=gcp_project_id,
-        location=gcp_location,
-        http_options=HttpOptions(api_version="v1")
-    )
-except Exception as e:
-    print(f"Error initializing Gemini Client: {e}")
+prompt = """
+Analyze the provided image of an invoice. Extract the following key entities:
+- Invoice Number
+- Date of Issue
+- Vendor Name
+- Total Amount Due
+- A list of line items, where each line item includes:
+    - Description
+    - Quantity
+    - Unit Price
+    - Line Total
+Return the result as JSON with the fields invoice_number, date_of_issue, vendor_name,
+total_amount_due and line_items (each with description, quantity, unit_price and line_total).
+Use null for any field that is not visible.
+"""
 
-def extract_invoice_entities(image_bytes):
+@cached_analyzer("extract_invoice_entities", prompt)
+async def extract_invoice_entities(image_bytes):
     """
     Extracts key entities from an invoice image.
     Args:
-        image_path (str): The path to the image file.
+        image_bytes (bytes): The raw bytes of the image file.
     Returns:
         dict: A dictionary containing the extracted invoice data.
     """
     try:
-        image = Image.open(BytesIO(image_bytes))
+        image = await prepare_image(image_bytes, "extract_invoice_entities")
         
-        prompt = """
-        Analyze the provided image of an invoice. Extract the following key entities:
-        - Invoice Number
-        - Date of Issue
-        - Vendor Name
-        - Total Amount Due
-        - A list of line items, where each line item includes:
-            - Description
-            - Quantity
-            - Unit Price
-            - Line Total
-        """
-        
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=[image, prompt]
-        )
-        
-        return response.text
+        return await generate_structured([image, prompt], InvoiceEntities, "extract_invoice_entities")
 
+    except StructuredOutputError as e:
+        return {"error": str(e), "raw_response": e.raw_response}
     except Exception as e:
         return {"error": str(e)}
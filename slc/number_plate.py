@@ -1,26 +1,16 @@
-from PIL import Image
-from google import genai
-import os
-from google.genai.types import HttpOptions
-from io import BytesIO
+from .image_preprocess import prepare_image
+from .result_cache import cached_analyzer
+from .schemas import NumberPlate
+from .structured_output import generate_structured, StructuredOutputError
 
-try:
-    gcp_project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
-    gcp_location = "global"
-    
-    if not gcp_project_id:
-        raise ValueError("GCP_PROJECT_ID environment variable not set.")
-    
-    client = genai.Client(
-        vertexai=True,
-        project=gcp_project_id,
-        location=gcp_location,
-        http_options=HttpOptions(api_version="v1")
-    )
-except Exception as e:
-    print(f"Error initializing Gemini Client: {e}")
+prompt = """
+Extract the number plate from the vehicle shown in this image. 
+Only return the exact alphanumeric characters of the license plate number.
+Return the result as JSON with the field number_plate containing only those characters.
+"""
 
-def extract_number_plate(image_bytes):
+@cached_analyzer("extract_number_plate", prompt)
+async def extract_number_plate(image_bytes):
     """
     Extracts the number plate from a vehicle in an image.
     Args:
@@ -29,19 +19,12 @@ def extract_number_plate(image_bytes):
         str: The extracted alphanumeric characters of the number plate, or an error message.
     """
     try:
-        image = Image.open(BytesIO(image_bytes))
+        image = await prepare_image(image_bytes, "extract_number_plate")
         
-        prompt = """
-        Extract the number plate from the vehicle shown in this image. 
-        Only return the exact alphanumeric characters of the license plate number.
-        """
-        
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=[image, prompt]
-        )
-        
-        return response.text.strip()
+        result = await generate_structured([image, prompt], NumberPlate, "extract_number_plate")
+        return result["number_plate"].strip()
 
+    except StructuredOutputError as e:
+        return {"error": str(e), "raw_response": e.raw_response}
     except Exception as e:
         return {"error": str(e)}
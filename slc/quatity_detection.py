@@ -1,47 +1,29 @@
-from PIL import Image
-from google import genai
-import os
-from google.genai.types import HttpOptions
-from io import BytesIO
+from .image_preprocess import prepare_image
+from .result_cache import cached_analyzer
+from .schemas import WeightReading
+from .structured_output import generate_structured, StructuredOutputError
 
-try:
-    gcp_project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
-    gcp_location = "global"
-    
-    if not gcp_project_id:
-        raise ValueError("GCP_PROJECT_ID environment variable not set.")
-    
-    client = genai.Client(
-        vertexai=True,
-        project=gcp_project_id,
-        location=gcp_location,
-        http_options=HttpOptions(api_version="v1")
-    )
-except Exception as e:
-    print(f"Error initializing Gemini Client: {e}")
+prompt = """
+Identify and extract the numerical weight reading displayed on the weighbridge's digital screen.
+Return the result as JSON with the field weight containing only the number.
+"""
 
-def count_bags(image_bytes):
+@cached_analyzer("count_bags", prompt)
+async def count_bags(image_bytes):
     """
     Counts the number of rice bags in an image.
     Args:
         image_bytes (bytes): The raw bytes of the image file.
     Returns:
-        int or str: The count of rice bags as an integer, or an error message.
+        float or dict: The weight reading, or a dict with an error message.
     """
     try:
-        image = Image.open(BytesIO(image_bytes))
+        image = await prepare_image(image_bytes, "count_bags")
         
-        prompt = """
-        Identify and extract the numerical weight reading displayed on the weighbridge's digital screen.
-        Return only the number.
-        """
-        
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=[image, prompt]
-        )
-        
-        return int(response.text.strip())
+        result = await generate_structured([image, prompt], WeightReading, "count_bags")
+        return result["weight"]
 
+    except StructuredOutputError as e:
+        return {"error": str(e), "raw_response": e.raw_response}
     except Exception as e:
         return {"error": str(e)}
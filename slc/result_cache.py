@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from functools import wraps
+from collections import OrderedDict
+from dotenv import load_dotenv
+from .gemini_client import DEFAULT_MODEL
+from . import image_preprocess
+
+# Load environment variables
+load_dotenv()
+
+# Cache settings
+SLC_CACHE_MAX_ENTRIES = int(os.getenv("SLC_CACHE_MAX_ENTRIES", "1000"))
+SLC_CACHE_TTL_SECONDS = int(os.getenv("SLC_CACHE_TTL_SECONDS", "86400"))  # 24 hours
+SLC_CACHE_DB_PATH = os.getenv("SLC_CACHE_DB_PATH")  # Optional on-disk tier, disabled when unset
+
+# In-memory LRU tier: maps cache key to (result, expires_at)
+_memory_cache = OrderedDict()
+_memory_lock = threading.Lock()
+
+_disk_conn = None
+_disk_lock = threading.Lock()
+
+cache_stats = {
+    "memory_hits": 0,
+    "disk_hits": 0,
+    "misses": 0,
+    "evictions": 0,
+}
+
+
+def prompt_version(prompt: str) -> str:
+    """Short hash of a prompt, so editing a prompt invalidates its cached results."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+def settings_version(analyzer: str, model: str = DEFAULT_MODEL) -> str:
+    """
+    Short hash of the model and the analyzer's current preprocessing settings, so
+    results computed under other settings (e.g. after set_preprocess_config) are not reused.
+    """
+    if image_preprocess.SLC_PREPROCESS_ENABLED:
+        preprocess = image_preprocess.get_preprocess_config(analyzer)
+    else:
+        preprocess = None
+    settings = json.dumps({"model": model, "preprocess": preprocess}, sort_keys=True)
+    return hashlib.sha256(settings.encode("utf-8")).hexdigest()[:12]
+
+
+def make_cache_key(image_bytes: bytes, analyzer: str, version: str) -> str:
+    image_hash = hashlib.sha256(image_bytes).hexdigest()
+    return f"{analyzer}:{version}:{image_hash}"
+
+
+def _get_disk_conn():
+    global _disk_conn
+    if _disk_conn is None:
+        os.makedirs(os.path.dirname(os.path.abspath(SLC_CACHE_DB_PATH)), exist_ok=True)
+        _disk_conn = sqlite3.connect(SLC_CACHE_DB_PATH, check_same_thread=False)
+        _disk_conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        _disk_conn.commit()
+    return _disk_conn
+
+
+def _disk_get(key):
+    with _disk_lock:
+        conn = _get_disk_conn()
+        row = conn.execute("SELECT value, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at <= time.time():
+            conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            conn.commit()
+            return None
+        return json.loads(value), expires_at
+
+
+def _disk_set(key, result, expires_at):
+    with _disk_lock:
+        conn = _get_disk_conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(result), expires_at)
+        )
+        # Opportunistically drop expired rows
+        conn.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+        conn.commit()
+
+
+def _memory_get(key):
+    with _memory_lock:
+        entry = _memory_cache.get(key)
+        if entry is None:
+            return None
+        result, expires_at = entry
+        if expires_at <= time.time():
+            del _memory_cache[key]
+            return None
+        _memory_cache.move_to_end(key)
+        return result
+
+
+def _memory_set(key, result, expires_at):
+    with _memory_lock:
+        _memory_cache[key] = (result, expires_at)
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > SLC_CACHE_MAX_ENTRIES:
+            _memory_cache.popitem(last=False)
+            cache_stats["evictions"] += 1
+
+
+async def get_cached_result(key):
+    result = _memory_get(key)
+    if result is not None:
+        cache_stats["memory_hits"] += 1
+        return result
+
+    if SLC_CACHE_DB_PATH:
+        entry = await asyncio.to_thread(_disk_get, key)
+        if entry is not None:
+            result, expires_at = entry
+            _memory_set(key, result, expires_at)
+            cache_stats["disk_hits"] += 1
+            return result
+
+    cache_stats["misses"] += 1
+    return None
+
+
+async def set_cached_result(key, result):
+    expires_at = time.time() + SLC_CACHE_TTL_SECONDS
+    _memory_set(key, result, expires_at)
+    if SLC_CACHE_DB_PATH:
+        await asyncio.to_thread(_disk_set, key, result, expires_at)
+
+
+def _has_error(result):
+    """Error results (including per-section errors of a merged report) are never cached."""
+    if not isinstance(result, dict):
+        return False
+    if "error" in result:
+        return True
+    return any(isinstance(value, dict) and "error" in value for value in result.values())
+
+
+def cached_analyzer(analyzer: str, prompt: str, model: str = DEFAULT_MODEL):
+    """
+    Decorator for async slc analyzers that take the raw image bytes.
+    Results are cached by (analyzer, prompt version, model and preprocessing settings,
+    sha256 of the image bytes), so resubmitted photos are answered without calling Gemini again.
+    """
+    version = prompt_version(prompt)
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(image_bytes, *args, **kwargs):
+            # Settings can change at runtime, so their hash is taken per call
+            key = make_cache_key(image_bytes, analyzer, f"{version}:{settings_version(analyzer, model)}")
+            cached = await get_cached_result(key)
+            if cached is not None:
+                return cached
+
+            result = await func(image_bytes, *args, **kwargs)
+            if result is not None and not _has_error(result):
+                try:
+                    await set_cached_result(key, result)
+                except Exception as e:
+                    print(f"Failed to cache {analyzer} result: {e}")
+            return result
+        return wrapper
+    return decorator
+
+
+def get_cache_stats():
+    hits = cache_stats["memory_hits"] + cache_stats["disk_hits"]
+    lookups = hits + cache_stats["misses"]
+    return {
+        **cache_stats,
+        "memory_entries": len(_memory_cache),
+        "disk_enabled": bool(SLC_CACHE_DB_PATH),
+        "hit_ratio": hits / lookups if lookups else 0.0,
+    }
+
+
+def clear_cache():
+    with _memory_lock:
+        _memory_cache.clear()
+    if SLC_CACHE_DB_PATH:
+        with _disk_lock:
+            conn = _get_disk_conn()
+            conn.execute("DELETE FROM results")
+            conn.commit()
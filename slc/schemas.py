@@ -0,0 +1,119 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+# Response schemas for the slc analyzers. They are sent to Gemini as the
+# response schema and used to validate what comes back.
+# Optional fields are sent as nullable. The Gemini API rejects any default other
+# than None in a response schema, so list defaults use default_factory, which
+# pydantic leaves out of the JSON schema.
+
+
+# Grain Detector
+
+class GrainCount(BaseModel):
+    count: int
+    percentage: float
+
+class GrainQualityBreakdown(BaseModel):
+    whole_grains: GrainCount
+    broken_grains: GrainCount
+    discolored_grains: GrainCount
+
+class GrainAnalysis(BaseModel):
+    total_grains: int
+    grain_quality: GrainQualityBreakdown
+    defects: List[str]
+    analysis_summary: str
+
+
+# Quality Analyzer
+
+class QualityPercentage(BaseModel):
+    percentage: float
+
+class QualityDistribution(BaseModel):
+    excellent: QualityPercentage
+    good: QualityPercentage
+    fair: QualityPercentage
+    poor: QualityPercentage
+
+class QualityAnalysis(BaseModel):
+    overall_quality: str
+    quality_distribution: QualityDistribution
+    issues_detected: List[str]
+    recommendations: str
+
+
+# Variety Identifier
+
+class PossibleVariety(BaseModel):
+    variety: str
+    confidence: float
+
+class VarietyIdentification(BaseModel):
+    predicted_variety: str
+    confidence: float
+    possible_varieties: List[PossibleVariety]
+    features_used: str
+
+
+# Commodity Classifier
+
+class PossibleCommodity(BaseModel):
+    commodity: str
+    confidence: float
+
+class CommodityClassification(BaseModel):
+    predicted_commodity: str
+    confidence: float
+    possible_classes: List[PossibleCommodity]
+    features_used: str
+
+
+# Full Grain Report
+
+class FullGrainReport(BaseModel):
+    grain_analysis: GrainAnalysis
+    quality_analysis: QualityAnalysis
+    variety_identification: VarietyIdentification
+    commodity_classification: CommodityClassification
+
+
+# Invoice
+
+class InvoiceLineItem(BaseModel):
+    description: Optional[str] = None
+    quantity: Optional[float] = None
+    unit_price: Optional[float] = None
+    line_total: Optional[float] = None
+
+class InvoiceEntities(BaseModel):
+    invoice_number: Optional[str] = None
+    date_of_issue: Optional[str] = None
+    vendor_name: Optional[str] = None
+    total_amount_due: Optional[float] = None
+    line_items: List[InvoiceLineItem] = Field(default_factory=list)
+
+
+# Number Plate
+
+class NumberPlate(BaseModel):
+    number_plate: str
+
+
+# Quantity Detection
+
+class WeightReading(BaseModel):
+    weight: float  # Weighbridge displays can show decimals
+
+
+# Weighbridge Slip
+
+class WeighBridgeSlip(BaseModel):
+    slip_number: Optional[str] = None
+    vehicle_number: Optional[str] = None
+    date: Optional[str] = None
+    gross_weight: Optional[float] = None
+    tare_weight: Optional[float] = None
+    net_weight: Optional[float] = None
+    material: Optional[str] = None
@@ -0,0 +1,89 @@
+from pydantic import BaseModel, ValidationError
+from google.genai import types
+from .gemini_client import generate_content
+
+# Per-analyzer parse counters
+parse_stats = {}
+
+
+class StructuredOutputError(Exception):
+    """Raised when the model output still fails validation after the repair retry."""
+
+    def __init__(self, message: str, raw_response: str):
+        super().__init__(message)
+        self.raw_response = raw_response
+
+
+def _stats_for(analyzer: str) -> dict:
+    if analyzer not in parse_stats:
+        parse_stats[analyzer] = {
+            "requests": 0,
+            "parse_failures": 0,
+            "repairs": 0,
+            "repair_failures": 0,
+        }
+    return parse_stats[analyzer]
+
+
+def _strip_code_fences(text: str) -> str:
+    """Remove markdown code fences in case the model wraps its JSON anyway."""
+    cleaned_text = text.strip()
+    if cleaned_text.startswith("```"):
+        cleaned_text = cleaned_text.strip("`")
+        if cleaned_text.lower().startswith("json"):
+            cleaned_text = cleaned_text[4:].strip()
+    return cleaned_text
+
+
+def _json_config(schema):
+    return types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema=schema
+    )
+
+
+async def generate_structured(contents, schema: type[BaseModel], analyzer: str) -> dict:
+    """
+    Request JSON-mode output matching `schema` and validate it.
+    If validation fails, one text-only repair request is made (the image is not
+    re-sent) before giving up with StructuredOutputError.
+    """
+    stats = _stats_for(analyzer)
+    stats["requests"] += 1
+
+    response = await generate_content(contents, config=_json_config(schema))
+    raw_text = _strip_code_fences(response.text or "")
+
+    try:
+        return schema.model_validate_json(raw_text).model_dump()
+    except ValidationError as e:
+        stats["parse_failures"] += 1
+        error = e
+
+    # Single cheap repair attempt
+    stats["repairs"] += 1
+    repair_prompt = (
+        "The following output did not match the required JSON schema.\n\n"
+        f"Validation errors:\n{error}\n\n"
+        f"Output:\n{raw_text}\n\n"
+        "Return only the corrected JSON."
+    )
+    response = await generate_content([repair_prompt], config=_json_config(schema))
+    repaired_text = _strip_code_fences(response.text or "")
+
+    try:
+        return schema.model_validate_json(repaired_text).model_dump()
+    except ValidationError:
+        stats["repair_failures"] += 1
+        raise StructuredOutputError("Invalid JSON response", raw_text)
+
+
+def get_parse_stats():
+    stats = {}
+    for analyzer, counters in parse_stats.items():
+        requests = counters["requests"]
+        stats[analyzer] = {
+            **counters,
+            "parse_failure_rate": counters["parse_failures"] / requests if requests else 0.0,
+        }
+    return stats
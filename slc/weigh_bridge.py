@@ -1,26 +1,23 @@
-from PIL import Image
-from google import genai
-import os
-from google.genai.types import HttpOptions
-from io import BytesIO
+from .image_preprocess import prepare_image
+from .result_cache import cached_analyzer
+from .schemas import WeighBridgeSlip
+from .structured_output import generate_structured, StructuredOutputError
 
-try:
-    gcp_project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
-    gcp_location = "global"
-    
-    if not gcp_project_id:
-        raise ValueError("GCP_PROJECT_ID environment variable not set.")
-    
-    client = genai.Client(
-        vertexai=True,
-        project=gcp_project_id,
-        location=gcp_location,
-        http_options=HttpOptions(api_version="v1")
-    )
-except Exception as e:
-    print(f"Error initializing Gemini Client: {e}")
+prompt = """
+Analyze the provided image of a weighbridge slip. Extract the following key entities:
+- Slip Number
+- Vehicle Number
+- Date
+- Gross Weight
+- Tare Weight
+- Net Weight
+- Material/Product
+Return the result as JSON with the fields slip_number, vehicle_number, date, gross_weight,
+tare_weight, net_weight and material. Use null for any field that is not visible.
+"""
 
-def detect_weigh_bridge_slip(image_bytes):
+@cached_analyzer("detect_weigh_bridge_slip", prompt)
+async def detect_weigh_bridge_slip(image_bytes):
     """
     Extracts data from a weighbridge slip image.
     Args:
@@ -29,25 +26,11 @@ def detect_weigh_bridge_slip(image_bytes):
         dict: A dictionary containing the extracted weighbridge slip data.
     """
     try:
-        image = Image.open(BytesIO(image_bytes))
+        image = await prepare_image(image_bytes, "detect_weigh_bridge_slip")
         
-        prompt = """
-        Analyze the provided image of a weighbridge slip. Extract the following key entities:
-        - Slip Number
-        - Vehicle Number
-        - Date
-        - Gross Weight
-        - Tare Weight
-        - Net Weight
-        - Material/Product
-        """
-        
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=[image, prompt]
-        )
-        
-        return int(response.text.strip())
+        return await generate_structured([image, prompt], WeighBridgeSlip, "detect_weigh_bridge_slip")
 
+    except StructuredOutputError as e:
+        return {"error": str(e), "raw_response": e.raw_response}
     except Exception as e:
         return {"error": str(e)}
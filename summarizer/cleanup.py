@@ -1,23 +1,36 @@
 import os
-import time
-import asyncio
+from expiry_scheduler import ExpiryScheduler
 from .config import TEMP_UPLOAD_DIR_SUMM, PDF_TTL_SECONDS, CLEANUP_INTERVAL_SECONDS
 
+
+def _expire_pdfs(pdf_ids):
+    """Remove expired PDFs; returns the IDs whose file could not be deleted."""
+    deleted_files = []
+    failed = []
+    for pdf_id in pdf_ids:
+        try:
+            os.remove(os.path.join(TEMP_UPLOAD_DIR_SUMM, pdf_id))
+        except FileNotFoundError:
+            pass  # Already gone
+        except Exception as e:
+            print(f"Failed to delete {pdf_id}: {e}")
+            failed.append(pdf_id)
+            continue
+        deleted_files.append(pdf_id)
+    if deleted_files:
+        print(f"Cleanup: Removed PDFs {deleted_files}")
+    return failed
+
+
+expiry_scheduler = ExpiryScheduler("summarizer cleanup", _expire_pdfs)
+
+
+def schedule_pdf_expiry(pdf_id: str):
+    """Call after saving an upload; the PDF is removed PDF_TTL_SECONDS later."""
+    expiry_scheduler.schedule(pdf_id, PDF_TTL_SECONDS)
+
+
 async def cleanup_task_summ():
-    while True:
-        now = time.time()
-        deleted_files = []
-        for filename in os.listdir(TEMP_UPLOAD_DIR_SUMM):
-            filepath = os.path.join(TEMP_UPLOAD_DIR_SUMM, filename)
-            if not os.path.isfile(filepath):
-                continue
-            file_age = now - os.path.getmtime(filepath)
-            if file_age > PDF_TTL_SECONDS:
-                try:
-                    os.remove(filepath)
-                    deleted_files.append(filename)
-                except Exception as e:
-                    print(f"Failed to delete {filename}: {e}")
-        if deleted_files:
-            print(f"Cleanup: Removed PDFs {deleted_files}")
-        await asyncio.sleep(CLEANUP_INTERVAL_SECONDS)
+    # Schedules existing uploads at startup, then sweeps every CLEANUP_INTERVAL_SECONDS
+    # for uploads that were saved without calling schedule_pdf_expiry
+    await expiry_scheduler.run(TEMP_UPLOAD_DIR_SUMM, PDF_TTL_SECONDS, CLEANUP_INTERVAL_SECONDS)
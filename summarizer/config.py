@@ -5,4 +5,19 @@ TEMP_UPLOAD_DIR_SUMM = os.path.join(BASE_DIR, "summarizer", "tmp_uploads")
 os.makedirs(TEMP_UPLOAD_DIR_SUMM, exist_ok=True)
 
 PDF_TTL_SECONDS = 3600  # 1 hour TTL for temporary PDFs
-CLEANUP_INTERVAL_SECONDS = 1800  # Run cleanup every 30 minutes
+CLEANUP_INTERVAL_SECONDS = 1800  # Backstop sweep for uploads that were never scheduled
+
+# Map-reduce summarization
+SUMMARY_MODEL = "gpt-4"
+SUMMARY_MAX_TOKENS = 300  # Length of the final summary
+SUMMARY_CHUNK_TOKENS = 3000  # Input tokens per map/reduce request (gpt-4 has an 8k context)
+SUMMARY_CHUNK_SUMMARY_TOKENS = 300  # Length of each intermediate summary
+SUMMARY_MAX_CONCURRENCY = 4  # Concurrent summarization requests
+SUMMARY_CHUNK_CACHE_SIZE = 2048  # Cached intermediate summaries
+
+# Summary cache (keyed by PDF content hash; lives outside TEMP_UPLOAD_DIR_SUMM so it survives cleanup)
+SUMMARY_CACHE_DB_PATH = os.path.join(BASE_DIR, "summarizer", "summary_cache", "summaries.db")
+SUMMARY_CACHE_TTL_SECONDS = 7 * 24 * 3600  # 7 days
+SUMMARY_CACHE_MEMORY_ENTRIES = 256
+SUMMARY_CACHE_DISK_ENTRIES = 10000
+SUMMARY_CACHE_TOUCH_FLUSH_SECONDS = 60  # How often memory hits refresh last_access on disk
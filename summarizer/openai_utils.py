@@ -1,6 +1,19 @@
 import os
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import openai
+import tiktoken
+from .config import (
+    SUMMARY_MODEL,
+    SUMMARY_MAX_TOKENS,
+    SUMMARY_CHUNK_TOKENS,
+    SUMMARY_CHUNK_SUMMARY_TOKENS,
+    SUMMARY_MAX_CONCURRENCY,
+    SUMMARY_CHUNK_CACHE_SIZE,
+)
 
 load_dotenv()
 
@@ -8,21 +21,121 @@ openai.api_key = os.getenv("OPENAI_API_KEY")
 if openai.api_key is None:
     raise ValueError("OpenAI API key not found. Please set it in the .env file.")
 
-def generate_summary(text: str) -> str:
+# Loaded on first use: tiktoken may download its BPE file, which shouldn't happen at import time
+_encoding = None
+
+SYSTEM_PROMPT = "You are a helpful assistant that summarizes documents."
+MAP_PROMPT = "Summarize the following section of a longer document. Keep all key facts, names and figures:\n\n{text}"
+REDUCE_PROMPT = "The following are summaries of consecutive sections of one document. Combine them into a single summary:\n\n{text}"
+FINAL_PROMPT = "Please provide a concise summary of the following document content:\n\n{text}"
+
+# Intermediate summaries keyed by sha256(model, prompt, max_tokens, text), so
+# re-summarizing a document, or asking for a different final length, reuses them
+_summary_cache = OrderedDict()
+_summary_cache_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    return len(_get_encoding().encode(text, disallowed_special=()))
+
+
+def split_text(text: str, max_tokens: int = SUMMARY_CHUNK_TOKENS) -> list[str]:
     """
-    Generate a summary of the input text using OpenAI ChatCompletion.
-    If the text is very long, consider chunking before calling.
+    Pack paragraphs into chunks of at most `max_tokens` tokens.
+    Paragraph boundaries keep chunks stable between runs, so their cached summaries
+    are reused; a paragraph longer than the budget is split by tokens.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for paragraph in text.split("\n\n"):
+        tokens = count_tokens(paragraph)
+        if tokens > max_tokens:
+            if current:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            # Cut the paragraph at token offsets rather than decoding token slices,
+            # which could split a multi-byte character
+            token_ids = _get_encoding().encode(paragraph, disallowed_special=())
+            _, offsets = _get_encoding().decode_with_offsets(token_ids)
+            bounds = offsets[::max_tokens] + [len(paragraph)]
+            for start, end in zip(bounds, bounds[1:]):
+                chunks.append(paragraph[start:end])
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(paragraph)
+        current_tokens += tokens
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def _cache_key(prompt: str, text: str, max_tokens: int) -> str:
+    return hashlib.sha256(f"{SUMMARY_MODEL}\0{prompt}\0{max_tokens}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _summarize(prompt: str, text: str, max_tokens: int) -> str:
     """
-    system_prompt = "You are a helpful assistant that summarizes documents."
-    user_prompt = f"Please provide a concise summary of the following document content:\n\n{text}"
+    Run one summarization request, reusing a cached result for identical input.
+    """
+    key = _cache_key(prompt, text, max_tokens)
+    with _summary_cache_lock:
+        if key in _summary_cache:
+            _summary_cache.move_to_end(key)
+            return _summary_cache[key]
 
     response = openai.chat.completions.create(
-        model="gpt-4",  # or "gpt-3.5-turbo"
+        model=SUMMARY_MODEL,
         messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt.format(text=text)},
         ],
-        max_tokens=300,
+        max_tokens=max_tokens,
         temperature=0.3,
     )
-    return response.choices[0].message.content.strip()
+    summary = response.choices[0].message.content.strip()
+
+    with _summary_cache_lock:
+        _summary_cache[key] = summary
+        while len(_summary_cache) > SUMMARY_CHUNK_CACHE_SIZE:
+            _summary_cache.popitem(last=False)
+    return summary
+
+
+def _summarize_all(executor, prompt: str, texts: list[str]) -> list[str]:
+    # map() keeps the document order of the sections
+    return list(executor.map(lambda text: _summarize(prompt, text, SUMMARY_CHUNK_SUMMARY_TOKENS), texts))
+
+
+def generate_summary(text: str, max_tokens: int = SUMMARY_MAX_TOKENS) -> str:
+    """
+    Generate a summary of the input text using OpenAI ChatCompletion.
+    Text that fits in one request is summarized directly. Longer text is map-reduced:
+    chunks are summarized concurrently, then the summaries are combined level by
+    level until they fit in one final request.
+    """
+    if count_tokens(text) <= SUMMARY_CHUNK_TOKENS:
+        return _summarize(FINAL_PROMPT, text, max_tokens)
+
+    with ThreadPoolExecutor(max_workers=SUMMARY_MAX_CONCURRENCY) as executor:
+        # Map
+        summaries = _summarize_all(executor, MAP_PROMPT, split_text(text))
+
+        # Reduce until the combined summaries fit in one request
+        combined = "\n\n".join(summaries)
+        while count_tokens(combined) > SUMMARY_CHUNK_TOKENS and len(summaries) > 1:
+            summaries = _summarize_all(executor, REDUCE_PROMPT, split_text(combined))
+            combined = "\n\n".join(summaries)
+
+    return _summarize(FINAL_PROMPT, combined, max_tokens)
@@ -1,11 +1,8 @@
-import fitz  # PyMuPDF
+from pdf_pages import iter_pdf_pages
+
 
 def extract_text_from_pdf(pdf_path: str) -> str:
     """
     Extract all text from PDF by pages and combine into a single string.
     """
-    doc = fitz.open(pdf_path)
-    full_text = []
-    for page in doc:
-        full_text.append(page.get_text())
-    return "\n\n".join(full_text)
+    return "\n\n".join(iter_pdf_pages(pdf_path))
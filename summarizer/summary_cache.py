@@ -0,0 +1,250 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from .config import (
+    SUMMARY_MODEL,
+    SUMMARY_MAX_TOKENS,
+    SUMMARY_CACHE_DB_PATH,
+    SUMMARY_CACHE_TTL_SECONDS,
+    SUMMARY_CACHE_MEMORY_ENTRIES,
+    SUMMARY_CACHE_DISK_ENTRIES,
+    SUMMARY_CACHE_TOUCH_FLUSH_SECONDS,
+)
+from .pdf_utils import extract_text_from_pdf
+from .openai_utils import generate_summary
+
+# Two tiers keyed by sha256 of the PDF bytes (plus model and summary length):
+#   memory: LRU of (summary, expires_at)
+#   disk:   SQLite table, also mapping pdf_id -> content hash so a summary can be
+#           served after cleanup_task_summ has deleted the uploaded file
+_memory_cache = OrderedDict()
+_memory_lock = threading.Lock()
+
+_disk_conn = None
+_disk_lock = threading.Lock()
+
+# Memory hits never reach the disk tier, so their access times are collected here
+# and written in one batch; otherwise hot summaries would look least recently used
+# on disk and be the first rows dropped by the size limit.
+_pending_touches = {}  # key -> last access time
+_last_touch_flush = time.time()
+
+cache_stats = {
+    "memory_hits": 0,
+    "disk_hits": 0,
+    "misses": 0,
+    "evictions": 0,
+}
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_cache_key(content_hash: str, max_tokens: int = SUMMARY_MAX_TOKENS) -> str:
+    return f"{SUMMARY_MODEL}:{max_tokens}:{content_hash}"
+
+
+def _get_disk_conn():
+    global _disk_conn
+    if _disk_conn is None:
+        os.makedirs(os.path.dirname(SUMMARY_CACHE_DB_PATH), exist_ok=True)
+        _disk_conn = sqlite3.connect(SUMMARY_CACHE_DB_PATH, check_same_thread=False)
+        _disk_conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "key TEXT PRIMARY KEY, summary TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        _disk_conn.execute(
+            "CREATE TABLE IF NOT EXISTS uploads (pdf_id TEXT PRIMARY KEY, content_hash TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        _disk_conn.commit()
+    return _disk_conn
+
+
+def _disk_get(key):
+    with _disk_lock:
+        conn = _get_disk_conn()
+        row = conn.execute("SELECT summary, expires_at FROM summaries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        summary, expires_at = row
+        if expires_at <= time.time():
+            conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+            conn.commit()
+            return None
+        conn.execute("UPDATE summaries SET last_access = ? WHERE key = ?", (time.time(), key))
+        conn.commit()
+        return summary, expires_at
+
+
+def _flush_touches(conn):
+    """Write pending memory-hit access times to disk; caller holds _disk_lock."""
+    global _last_touch_flush
+    with _memory_lock:
+        touches = list(_pending_touches.items())
+        _pending_touches.clear()
+    _last_touch_flush = time.time()
+    if touches:
+        conn.executemany(
+            "UPDATE summaries SET last_access = MAX(last_access, ?) WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in touches]
+        )
+        conn.commit()
+
+
+def _maybe_flush_touches():
+    if time.time() - _last_touch_flush < SUMMARY_CACHE_TOUCH_FLUSH_SECONDS:
+        return
+    with _disk_lock:
+        _flush_touches(_get_disk_conn())
+
+
+def _disk_set(key, summary, expires_at):
+    now = time.time()
+    with _disk_lock:
+        conn = _get_disk_conn()
+        _flush_touches(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO summaries (key, summary, expires_at, last_access) VALUES (?, ?, ?, ?)",
+            (key, summary, expires_at, now)
+        )
+        conn.execute("DELETE FROM summaries WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM uploads WHERE expires_at <= ?", (now,))
+        # Size limit: drop the least recently used rows
+        conn.execute(
+            "DELETE FROM summaries WHERE key IN ("
+            "SELECT key FROM summaries ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (SUMMARY_CACHE_DISK_ENTRIES,)
+        )
+        conn.commit()
+
+
+def _memory_get(key):
+    with _memory_lock:
+        entry = _memory_cache.get(key)
+        if entry is None:
+            return None
+        summary, expires_at = entry
+        if expires_at <= time.time():
+            del _memory_cache[key]
+            return None
+        _memory_cache.move_to_end(key)
+        _pending_touches[key] = time.time()
+        return summary
+
+
+def _memory_set(key, summary, expires_at):
+    with _memory_lock:
+        _memory_cache[key] = (summary, expires_at)
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > SUMMARY_CACHE_MEMORY_ENTRIES:
+            _memory_cache.popitem(last=False)
+            cache_stats["evictions"] += 1
+
+
+def get_cached_summary(content_hash: str, max_tokens: int = SUMMARY_MAX_TOKENS):
+    key = make_cache_key(content_hash, max_tokens)
+    summary = _memory_get(key)
+    if summary is not None:
+        cache_stats["memory_hits"] += 1
+        try:
+            _maybe_flush_touches()
+        except Exception as e:
+            print(f"Failed to update summary cache access times: {e}")
+        return summary
+
+    entry = _disk_get(key)
+    if entry is not None:
+        summary, expires_at = entry
+        _memory_set(key, summary, expires_at)
+        cache_stats["disk_hits"] += 1
+        return summary
+
+    cache_stats["misses"] += 1
+    return None
+
+
+def set_cached_summary(content_hash: str, summary: str, max_tokens: int = SUMMARY_MAX_TOKENS):
+    key = make_cache_key(content_hash, max_tokens)
+    expires_at = time.time() + SUMMARY_CACHE_TTL_SECONDS
+    _memory_set(key, summary, expires_at)
+    _disk_set(key, summary, expires_at)
+
+
+def remember_upload(pdf_id: str, pdf_path: str) -> str:
+    """
+    Hash an uploaded PDF and record pdf_id -> content hash.
+    Call at upload time; returns the content hash.
+    """
+    content_hash = hash_file(pdf_path)
+    with _disk_lock:
+        conn = _get_disk_conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO uploads (pdf_id, content_hash, expires_at) VALUES (?, ?, ?)",
+            (pdf_id, content_hash, time.time() + SUMMARY_CACHE_TTL_SECONDS)
+        )
+        conn.commit()
+    return content_hash
+
+
+def _lookup_upload(pdf_id: str):
+    with _disk_lock:
+        row = _get_disk_conn().execute(
+            "SELECT content_hash FROM uploads WHERE pdf_id = ? AND expires_at > ?",
+            (pdf_id, time.time())
+        ).fetchone()
+    return row[0] if row else None
+
+
+def get_summary_for_pdf(pdf_id: str, pdf_path: str, max_tokens: int = SUMMARY_MAX_TOKENS) -> str:
+    """
+    Return the summary of an uploaded PDF, generating it only for content not seen before.
+    Works after the file itself has expired as long as its summary is still cached.
+    Raises FileNotFoundError when neither the file nor a cached summary exists.
+    """
+    content_hash = _lookup_upload(pdf_id)
+    if content_hash is None:
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(pdf_path)
+        content_hash = remember_upload(pdf_id, pdf_path)
+
+    summary = get_cached_summary(content_hash, max_tokens)
+    if summary is not None:
+        return summary
+
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(pdf_path)
+    summary = generate_summary(extract_text_from_pdf(pdf_path), max_tokens)
+    try:
+        set_cached_summary(content_hash, summary, max_tokens)
+    except Exception as e:
+        print(f"Failed to cache summary for {pdf_id}: {e}")
+    return summary
+
+
+def get_cache_stats():
+    hits = cache_stats["memory_hits"] + cache_stats["disk_hits"]
+    lookups = hits + cache_stats["misses"]
+    return {
+        **cache_stats,
+        "memory_entries": len(_memory_cache),
+        "hit_ratio": hits / lookups if lookups else 0.0,
+    }
+
+
+def clear_cache():
+    with _memory_lock:
+        _memory_cache.clear()
+        _pending_touches.clear()
+    with _disk_lock:
+        conn = _get_disk_conn()
+        conn.execute("DELETE FROM summaries")
+        conn.execute("DELETE FROM uploads")
+        conn.commit()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Service packages are imported from the repository root (as app.py does)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Config modules read these at import time; no test talks to the real services
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("DB_PORT", "3306")
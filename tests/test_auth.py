@@ -0,0 +1,371 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+for module in ("jose", "aiohttp", "requests", "fastapi", "dotenv"):
+    pytest.importorskip(module)
+
+from fastapi import HTTPException
+
+import auth
+
+
+class FakeJWKS:
+    """
+    Stand-in for get_jwks: serves {kid: pem} documents (key building is stubbed out
+    too), counts fetches, and can fail or block until released.
+    """
+
+    def __init__(self, keys):
+        self.keys = dict(keys)
+        self.calls = 0
+        self.error = None
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(timeout=5)
+        if self.error is not None:
+            raise self.error
+        return dict(self.keys)
+
+
+@pytest.fixture(autouse=True)
+def jwks_state(monkeypatch):
+    """Start every test with an empty JWKS cache and token cache."""
+    monkeypatch.setattr(auth, "_jwks_keys", {})
+    monkeypatch.setattr(auth, "_jwks_fetched_at", 0.0)
+    monkeypatch.setattr(auth, "_jwks_last_fetch_attempt", 0.0)
+    monkeypatch.setattr(auth, "_jwks_retry_after", 0.0)
+    monkeypatch.setattr(auth, "_jwks_refresh_in_progress", False)
+    monkeypatch.setattr(auth, "_jwks_async_lock", None)
+    monkeypatch.setattr(auth, "_jwks_background_task", None)
+    monkeypatch.setattr(auth, "jwks_cache_stats", dict.fromkeys(auth.jwks_cache_stats, 0))
+    monkeypatch.setattr(auth, "_build_key_map", dict)
+    auth.clear_token_cache()
+    yield
+    auth.clear_token_cache()
+
+
+@pytest.fixture
+def fake_jwks(monkeypatch):
+    fake = FakeJWKS({"kid_1": "pem_1"})
+    monkeypatch.setattr(auth, "get_jwks", fake)
+    return fake
+
+
+@pytest.fixture
+def fake_jwks_async(monkeypatch):
+    fake = FakeJWKS({"kid_1": "pem_1"})
+
+    async def get_jwks_async():
+        await asyncio.sleep(0.01)  # Give concurrent callers time to pile up
+        return fake()
+
+    monkeypatch.setattr(auth, "get_jwks_async", get_jwks_async)
+    return fake
+
+
+def load_keys(keys, age=0.0):
+    auth._jwks_keys = dict(keys)
+    auth._jwks_fetched_at = time.time() - age
+    auth._jwks_last_fetch_attempt = auth._jwks_fetched_at
+
+
+def wait_for_background_refresh():
+    deadline = time.time() + 5
+    while auth._jwks_refresh_in_progress and time.time() < deadline:
+        time.sleep(0.01)
+    assert not auth._jwks_refresh_in_progress
+
+
+def test_empty_cache_is_filled_inline(fake_jwks):
+    assert auth.get_public_key("kid_1") == "pem_1"
+    assert fake_jwks.calls == 1
+
+    assert auth.get_public_key("kid_1") == "pem_1"
+    assert fake_jwks.calls == 1
+
+
+def test_stale_keys_are_served_during_a_single_background_refresh(fake_jwks):
+    load_keys({"kid_1": "old_pem"}, age=auth.JWKS_CACHE_TTL_SECONDS + 60)
+    fake_jwks.keys = {"kid_1": "new_pem"}
+    fake_jwks.release.clear()
+
+    # The refresh is blocked, yet every request gets the stale key straight away
+    for _ in range(20):
+        assert auth.get_public_key("kid_1") == "old_pem"
+
+    fake_jwks.release.set()
+    wait_for_background_refresh()
+
+    assert fake_jwks.calls == 1
+    assert auth.jwks_cache_stats["background_refreshes"] == 1
+    assert auth.get_public_key("kid_1") == "new_pem"
+
+
+def test_fresh_keys_are_not_refreshed(fake_jwks):
+    load_keys({"kid_1": "pem_1"})
+
+    auth.get_public_key("kid_1")
+
+    assert fake_jwks.calls == 0
+    assert not auth._jwks_refresh_in_progress
+
+
+def test_unknown_kid_refetch_is_rate_limited(fake_jwks):
+    load_keys({"kid_1": "pem_1"})
+    fake_jwks.keys = {"kid_1": "pem_1", "kid_2": "pem_2"}
+
+    # The keys were fetched just now, so the unknown kid is rejected without a fetch
+    with pytest.raises(HTTPException) as error:
+        auth.get_public_key("kid_2")
+    assert error.value.status_code == 401
+    assert fake_jwks.calls == 0
+
+    # Once the refetch interval has passed, the unknown kid triggers one refetch
+    auth._jwks_last_fetch_attempt -= auth.JWKS_MIN_REFETCH_INTERVAL_SECONDS
+    assert auth.get_public_key("kid_2") == "pem_2"
+    assert fake_jwks.calls == 1
+
+
+def test_requests_during_an_unknown_kid_refetch_wait_for_it(fake_jwks):
+    load_keys({"kid_1": "pem_1"}, age=auth.JWKS_MIN_REFETCH_INTERVAL_SECONDS)
+    fake_jwks.keys = {"kid_1": "pem_1", "kid_2": "pem_2"}
+    fake_jwks.release.clear()
+    results = []
+
+    def request():
+        results.append(auth.get_public_key("kid_2"))
+
+    first = threading.Thread(target=request)
+    first.start()
+    while fake_jwks.calls == 0:
+        time.sleep(0.001)
+
+    # This request arrives while the refetch is blocked, inside the rate limit window
+    second = threading.Thread(target=request)
+    second.start()
+    time.sleep(0.05)
+    fake_jwks.release.set()
+    first.join()
+    second.join()
+
+    assert results == ["pem_2", "pem_2"]
+    assert fake_jwks.calls == 1
+
+
+def test_unknown_kids_cannot_force_repeated_fetches(fake_jwks):
+    load_keys({"kid_1": "pem_1"}, age=auth.JWKS_MIN_REFETCH_INTERVAL_SECONDS)
+
+    for kid in ("bogus_1", "bogus_2", "bogus_3"):
+        with pytest.raises(HTTPException):
+            auth.get_public_key(kid)
+
+    assert fake_jwks.calls == 1
+
+
+def test_failed_fetch_backs_off(fake_jwks):
+    fake_jwks.error = RuntimeError("JWKS endpoint down")
+
+    for _ in range(3):
+        with pytest.raises(HTTPException) as error:
+            auth.get_public_key("kid_1")
+        assert error.value.status_code == 500
+
+    # Only the first request hit the endpoint; the rest fail fast while backing off
+    assert fake_jwks.calls == 1
+    assert auth.jwks_cache_stats["refresh_failures"] == 1
+    assert auth._jwks_retry_after >= time.time() + auth.JWKS_RETRY_AFTER_FAILURE_SECONDS - 1
+
+    # After the backoff the next request fetches again
+    fake_jwks.error = None
+    auth._jwks_retry_after = time.time() - 1
+    assert auth.get_public_key("kid_1") == "pem_1"
+    assert fake_jwks.calls == 2
+    assert auth._jwks_retry_after == 0.0
+
+
+def test_failed_background_refresh_keeps_keys_and_backs_off(fake_jwks):
+    load_keys({"kid_1": "pem_1"}, age=auth.JWKS_CACHE_TTL_SECONDS + 60)
+    fake_jwks.error = RuntimeError("JWKS endpoint down")
+
+    assert auth.get_public_key("kid_1") == "pem_1"
+    wait_for_background_refresh()
+
+    # The stale keys are still served, and no new refresh starts during the backoff
+    assert auth.get_public_key("kid_1") == "pem_1"
+    assert fake_jwks.calls == 1
+    assert auth.jwks_cache_stats["background_refreshes"] == 1
+
+
+class FakeVerifier:
+    """Stand-in for _verify_token: tokens are looked up in a {token: payload} table."""
+
+    def __init__(self, payloads):
+        self.payloads = payloads
+        self.calls = 0
+
+    def __call__(self, token, public_key):
+        self.calls += 1
+        return dict(self.payloads[token])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(auth, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def verifier(monkeypatch, clock):
+    fake = FakeVerifier({
+        f"token_{i}": {"sub": f"user_{i}", "exp": clock[0] + 60} for i in range(5)
+    })
+    monkeypatch.setattr(auth, "_verify_token", fake)
+    monkeypatch.setattr(auth, "get_public_key", lambda kid: "pem_1")
+    monkeypatch.setattr(auth.jwt, "get_unverified_headers", lambda token: {"kid": "kid_1"})
+    monkeypatch.setattr(auth, "token_cache_stats", dict.fromkeys(auth.token_cache_stats, 0))
+    return fake
+
+
+def test_repeat_tokens_skip_verification(verifier):
+    for _ in range(3):
+        assert auth.decode_token("token_0")["sub"] == "user_0"
+
+    assert verifier.calls == 1
+    assert auth.token_cache_stats["hits"] == 2
+
+
+def test_cached_tokens_are_dropped_at_exp(verifier, clock):
+    auth.decode_token("token_0")
+
+    clock[0] += 59
+    auth.decode_token("token_0")
+    assert verifier.calls == 1
+
+    # At exp the cached payload is dropped and the token goes through full verification
+    clock[0] += 1
+    auth.decode_token("token_0")
+    assert verifier.calls == 2
+    assert auth.token_cache_stats["expired"] == 1
+
+
+def test_tokens_without_exp_are_not_cached(verifier):
+    verifier.payloads["no_exp"] = {"sub": "user_x"}
+
+    auth.decode_token("no_exp")
+    auth.decode_token("no_exp")
+
+    assert verifier.calls == 2
+    assert len(auth._token_cache) == 0
+
+
+def test_token_cache_evicts_least_recently_used(verifier, monkeypatch):
+    monkeypatch.setattr(auth, "TOKEN_CACHE_MAX_SIZE", 2)
+
+    auth.decode_token("token_0")
+    auth.decode_token("token_1")
+    auth.decode_token("token_0")  # token_1 is now the least recently used
+    auth.decode_token("token_2")
+
+    assert len(auth._token_cache) == 2
+    assert auth.token_cache_stats["evictions"] == 1
+
+    verifier.calls = 0
+    auth.decode_token("token_0")
+    auth.decode_token("token_2")
+    assert verifier.calls == 0
+    auth.decode_token("token_1")
+    assert verifier.calls == 1
+
+
+async def concurrent_public_keys(kid, count=20):
+    return await asyncio.gather(*(auth.get_public_key_async(kid) for _ in range(count)))
+
+
+def test_async_refresh_on_empty_cache_is_single_flight(fake_jwks_async):
+    keys = asyncio.run(concurrent_public_keys("kid_1"))
+
+    assert keys == ["pem_1"] * 20
+    assert fake_jwks_async.calls == 1
+
+
+def test_async_background_refresh_is_single_flight(fake_jwks_async):
+    load_keys({"kid_1": "old_pem"}, age=auth.JWKS_CACHE_TTL_SECONDS + 60)
+    fake_jwks_async.keys = {"kid_1": "new_pem"}
+
+    async def scenario():
+        stale = await concurrent_public_keys("kid_1")
+        await auth._jwks_background_task
+        return stale, await auth.get_public_key_async("kid_1")
+
+    stale, fresh = asyncio.run(scenario())
+
+    assert stale == ["old_pem"] * 20
+    assert fresh == "new_pem"
+    assert fake_jwks_async.calls == 1
+    assert auth.jwks_cache_stats["background_refreshes"] == 1
+
+
+def test_async_unknown_kid_refetch_is_single_flight(fake_jwks_async):
+    load_keys({"kid_1": "pem_1"}, age=auth.JWKS_MIN_REFETCH_INTERVAL_SECONDS)
+    fake_jwks_async.keys = {"kid_1": "pem_1", "kid_2": "pem_2"}
+
+    keys = asyncio.run(concurrent_public_keys("kid_2"))
+
+    assert keys == ["pem_2"] * 20
+    assert fake_jwks_async.calls == 1
+
+
+def test_async_failed_fetch_backs_off(fake_jwks_async):
+    fake_jwks_async.error = RuntimeError("JWKS endpoint down")
+
+    async def scenario():
+        results = []
+        for _ in range(3):
+            try:
+                await auth.get_public_key_async("kid_1")
+            except HTTPException as error:
+                results.append(error.status_code)
+        return results
+
+    assert asyncio.run(scenario()) == [500, 500, 500]
+    assert fake_jwks_async.calls == 1
+
+
+def test_async_verification_runs_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def verify(token, public_key):
+        threads.append(threading.current_thread().name)
+        return {"sub": "user_0", "exp": time.time() + 60}
+
+    async def get_public_key_async(kid):
+        return "pem_1"
+
+    monkeypatch.setattr(auth, "_verify_token", verify)
+    monkeypatch.setattr(auth, "get_public_key_async", get_public_key_async)
+    monkeypatch.setattr(auth.jwt, "get_unverified_headers", lambda token: {"kid": "kid_1"})
+
+    assert asyncio.run(auth.decode_token_async("token_0"))["sub"] == "user_0"
+    assert threads[0].startswith("token-verify")
+
+
+def test_admin_dependency_allows_listed_users(monkeypatch):
+    monkeypatch.setattr(auth, "ADMIN_USER_IDS", {"user_admin"})
+
+    assert asyncio.run(auth.get_admin_user_async("user_admin")) == "user_admin"
+
+
+def test_admin_dependency_rejects_other_users(monkeypatch):
+    monkeypatch.setattr(auth, "ADMIN_USER_IDS", {"user_admin"})
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(auth.get_admin_user_async("user_other"))
+    assert error.value.status_code == 403
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("mysql.connector")
+
+from mysql.connector import Error
+
+from nl2sql.cors import database
+
+
+class FakeRawConnection:
+    def __init__(self, reconnect_error=None):
+        self.reconnect_error = reconnect_error
+
+    def reconnect(self, attempts=1, delay=0):
+        if self.reconnect_error:
+            raise self.reconnect_error
+
+    def is_connected(self):
+        return True
+
+
+class FakePooledConnection:
+    def __init__(self, raw):
+        self._cnx = raw
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def get_connection(self):
+        return self.conn
+
+
+@pytest.fixture
+def pooled(monkeypatch):
+    def make(raw):
+        conn = FakePooledConnection(raw)
+        monkeypatch.setattr(database, "_get_pool", lambda: FakePool(conn))
+        return conn
+    return make
+
+
+def test_failed_health_check_returns_connection_to_pool(pooled, monkeypatch):
+    raw = FakeRawConnection(reconnect_error=Error(msg="server has gone away"))
+    conn = pooled(raw)
+    # Old enough to be recycled, which reconnects
+    monkeypatch.setitem(database._connected_at, id(raw), time.time() - database.DB_POOL_RECYCLE_SECONDS - 1)
+
+    assert database.get_db_connection() is None
+    assert conn.closed
+
+
+def test_healthy_connection_is_borrowed(pooled):
+    conn = pooled(FakeRawConnection())
+
+    assert database.get_db_connection() is conn
+    assert not conn.closed
+
+
+def test_run_query_raises_without_a_connection(monkeypatch):
+    monkeypatch.setattr(database, "get_db_connection", lambda: None)
+
+    with pytest.raises(Error):
+        database.run_query("SELECT 1")
+    assert database.execute_query("SELECT 1") == []
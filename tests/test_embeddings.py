@@ -0,0 +1,150 @@
+from types import SimpleNamespace
+
+import pytest
+
+for module in ("numpy", "faiss", "fitz", "tiktoken", "dotenv"):
+    pytest.importorskip(module)
+openai = pytest.importorskip("openai")
+httpx = pytest.importorskip("httpx")
+
+from pdf_data_extraction.app import embeddings
+
+EMBED_DIM = embeddings.EMBED_DIM
+
+
+def one_hot(position):
+    vector = [0.0] * EMBED_DIM
+    vector[position] = 2.0  # Not normalized, so normalization is exercised too
+    return vector
+
+
+class FakeEmbeddings:
+    """
+    Stand-in for openai.embeddings: texts are integers and embed to a one-hot vector
+    at that position. Items are returned in reverse order, tagged with their index.
+    """
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.requests = []
+
+    def create(self, input, model):
+        self.requests.append(list(input))
+        if self.failures:
+            raise self.failures.pop(0)
+        items = [SimpleNamespace(index=i, embedding=one_hot(int(text))) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(items)))
+
+
+def rate_limit_error(retry_after=None):
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+    response = httpx.Response(429, headers=headers, request=request)
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    fake = FakeEmbeddings()
+    monkeypatch.setattr(embeddings.openai, "embeddings", fake)
+    return fake
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    calls = []
+    monkeypatch.setattr(embeddings.time, "sleep", calls.append)
+    return calls
+
+
+@pytest.fixture
+def batch_limits(monkeypatch):
+    def set_limits(max_tokens, max_inputs):
+        monkeypatch.setattr(embeddings, "count_tokens", len)  # One token per character
+        monkeypatch.setattr(embeddings, "EMBED_BATCH_MAX_TOKENS", max_tokens)
+        monkeypatch.setattr(embeddings, "EMBED_BATCH_MAX_INPUTS", max_inputs)
+    return set_limits
+
+
+def test_batches_stay_under_the_token_budget(batch_limits):
+    batch_limits(max_tokens=10, max_inputs=100)
+
+    batches = list(embeddings.iter_batches(["aaaa", "bbbb", "cccc", "dd", "eeeeeeeeee"]))
+
+    assert batches == [["aaaa", "bbbb"], ["cccc", "dd"], ["eeeeeeeeee"]]
+
+
+def test_batches_stay_under_the_input_limit(batch_limits):
+    batch_limits(max_tokens=1000, max_inputs=3)
+
+    batches = list(embeddings.iter_batches([str(i) for i in range(7)]))
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+
+
+def test_oversized_chunk_gets_its_own_batch(batch_limits):
+    batch_limits(max_tokens=5, max_inputs=100)
+
+    batches = list(embeddings.iter_batches(["ab", "abcdefgh", "cd"]))
+
+    assert batches == [["ab"], ["abcdefgh"], ["cd"]]
+
+
+def test_known_token_counts_are_not_recounted(batch_limits, monkeypatch):
+    batch_limits(max_tokens=10, max_inputs=100)
+
+    def count_tokens(text):
+        raise AssertionError("token count was already known")
+
+    monkeypatch.setattr(embeddings, "count_tokens", count_tokens)
+
+    batches = list(embeddings.iter_batches([("a", 6), ("b", 6), ("c", 3)]))
+
+    assert batches == [["a"], ["b", "c"]]
+
+
+def test_retry_delay_honours_retry_after():
+    assert embeddings._retry_delay(rate_limit_error("2.5"), attempt=3) == 2.5
+
+
+def test_retry_delay_backs_off_exponentially_without_retry_after():
+    for attempt, base in [(0, 1), (3, 8), (10, 60)]:
+        delay = embeddings._retry_delay(rate_limit_error(), attempt)
+        assert base <= delay <= base + 1
+
+
+def test_batch_request_retries_rate_limits(fake_api, sleeps):
+    fake_api.failures = [rate_limit_error("1"), rate_limit_error("2")]
+
+    vectors = embeddings._embed_batch_request(["0", "1"])
+
+    assert len(fake_api.requests) == 3
+    assert sleeps == [1.0, 2.0]
+    assert vectors.shape == (2, EMBED_DIM)
+
+
+def test_batch_request_gives_up_after_max_retries(fake_api, sleeps, monkeypatch):
+    monkeypatch.setattr(embeddings, "EMBED_MAX_RETRIES", 2)
+    fake_api.failures = [rate_limit_error("0")] * 3
+
+    with pytest.raises(openai.RateLimitError):
+        embeddings._embed_batch_request(["0"])
+    assert len(fake_api.requests) == 3
+
+
+def test_batch_request_orders_results_by_item_index(fake_api):
+    vectors = embeddings._embed_batch_request(["5", "1", "3"])
+
+    assert list(vectors.argmax(axis=1)) == [5, 1, 3]
+
+
+def test_embed_chunks_keeps_input_order_across_concurrent_batches(fake_api, batch_limits):
+    batch_limits(max_tokens=1000, max_inputs=4)
+    texts = [str(i) for i in range(50)]
+
+    chunks, vectors = embeddings.embed_chunks(iter(texts))
+
+    assert chunks == texts
+    assert len(fake_api.requests) == 13
+    assert list(vectors.argmax(axis=1)) == list(range(50))
+    assert embeddings.np.allclose(embeddings.np.linalg.norm(vectors, axis=1), 1.0)
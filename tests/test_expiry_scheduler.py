@@ -0,0 +1,154 @@
+import asyncio
+import os
+import time
+
+from expiry_scheduler import ExpiryScheduler
+
+
+def run_scheduler(scheduler, seconds, **run_kwargs):
+    async def main():
+        task = asyncio.create_task(scheduler.run(**run_kwargs))
+        await asyncio.sleep(seconds)
+        task.cancel()
+
+    asyncio.run(main())
+
+
+def test_pop_due_returns_items_in_expiry_order():
+    scheduler = ExpiryScheduler("test", lambda ids: None)
+    now = time.time()
+    scheduler.schedule("c", expires_at=now - 1)
+    scheduler.schedule("a", expires_at=now - 3)
+    scheduler.schedule("later", expires_at=now + 60)
+    scheduler.schedule("b", expires_at=now - 2)
+
+    due, timeout = scheduler._pop_due(now)
+
+    assert due == ["a", "b", "c"]
+    assert 59 < timeout <= 60
+    assert scheduler.stats()["scheduled"] == 1
+
+
+def test_rescheduled_and_cancelled_items_are_skipped():
+    scheduler = ExpiryScheduler("test", lambda ids: None)
+    now = time.time()
+    scheduler.schedule("moved", expires_at=now - 2)
+    scheduler.schedule("moved", expires_at=now + 60)
+    scheduler.schedule("cancelled", expires_at=now - 1)
+    scheduler.cancel("cancelled")
+
+    due, _ = scheduler._pop_due(now)
+
+    assert due == []
+    assert scheduler.stats()["scheduled"] == 1
+
+
+def test_run_expires_due_items():
+    expired = []
+    scheduler = ExpiryScheduler("test", expired.extend)
+    scheduler.schedule("first", ttl_seconds=0.05)
+    scheduler.schedule("second", ttl_seconds=0.1)
+
+    run_scheduler(scheduler, 0.3)
+
+    assert expired == ["first", "second"]
+    assert scheduler.stats()["scheduled"] == 0
+
+
+def test_failed_expiry_is_retried_with_backoff():
+    attempts = []
+
+    def on_expire(item_ids):
+        attempts.append(time.time())
+        if len(attempts) < 3:
+            raise RuntimeError("vector store unavailable")
+
+    scheduler = ExpiryScheduler("test", on_expire, retry_delay_seconds=0.05)
+    scheduler.schedule("pdf", ttl_seconds=0)
+
+    run_scheduler(scheduler, 0.5)
+
+    assert len(attempts) == 3
+    # 0.05s after the first failure, then 0.1s after the second
+    assert attempts[1] - attempts[0] >= 0.05
+    assert attempts[2] - attempts[1] >= 0.1
+    assert scheduler.stats() == {"scheduled": 0, "retrying": 0, "next_expiry_in_seconds": None}
+
+
+def test_retry_delay_is_capped():
+    scheduler = ExpiryScheduler("test", lambda ids: None, retry_delay_seconds=10, max_retry_delay_seconds=25)
+    scheduler._failures["pdf"] = 5  # Uncapped delay would be 10 * 2**5 seconds
+
+    scheduler._retry_later(["pdf"])
+
+    assert 24 < scheduler._expiries["pdf"] - time.time() <= 25
+    assert scheduler.stats()["retrying"] == 1
+
+
+def test_sweep_schedules_only_unscheduled_files(tmp_path):
+    scheduler = ExpiryScheduler("test", lambda ids: None)
+    for name in ("known.pdf", "unknown.pdf"):
+        (tmp_path / name).write_bytes(b"%PDF")
+    os.mkdir(tmp_path / "subdir")
+    scheduler.schedule("known.pdf", ttl_seconds=600)
+    known_expiry = scheduler._expiries["known.pdf"]
+
+    added = scheduler.seed_from_directory(str(tmp_path), ttl_seconds=60)
+
+    assert added == 1
+    assert scheduler._expiries["known.pdf"] == known_expiry
+    assert scheduler._expiries["unknown.pdf"] == os.path.getmtime(tmp_path / "unknown.pdf") + 60
+
+
+def test_backstop_sweep_expires_files_saved_without_scheduling(tmp_path):
+    removed = []
+
+    def on_expire(item_ids):
+        for item_id in item_ids:
+            os.remove(tmp_path / item_id)
+            removed.append(item_id)
+
+    scheduler = ExpiryScheduler("test", on_expire)
+
+    async def main():
+        task = asyncio.create_task(scheduler.run(str(tmp_path), 0, 0.1))
+        await asyncio.sleep(0.05)
+        (tmp_path / "late.pdf").write_bytes(b"%PDF")
+        await asyncio.sleep(0.2)
+        task.cancel()
+
+    asyncio.run(main())
+
+    assert removed == ["late.pdf"]
+    assert os.listdir(tmp_path) == []
+
+
+def test_only_the_ids_returned_by_on_expire_are_retried():
+    attempts = []
+
+    def on_expire(item_ids):
+        attempts.append(list(item_ids))
+        return ["locked"] if len(attempts) == 1 else []
+
+    scheduler = ExpiryScheduler("test", on_expire, retry_delay_seconds=0.05)
+    scheduler.schedule("locked", ttl_seconds=0)
+    scheduler.schedule("free", ttl_seconds=0)
+
+    run_scheduler(scheduler, 0.3)
+
+    assert sorted(attempts[0]) == ["free", "locked"]
+    assert attempts[1:] == [["locked"]]
+    assert scheduler.stats()["retrying"] == 0
+
+
+def test_summarizer_cleanup_reports_files_it_could_not_delete(tmp_path, monkeypatch):
+    from summarizer import cleanup
+
+    monkeypatch.setattr(cleanup, "TEMP_UPLOAD_DIR_SUMM", str(tmp_path))
+    (tmp_path / "expired.pdf").write_bytes(b"%PDF")
+    os.mkdir(tmp_path / "undeletable.pdf")  # os.remove fails on a directory
+
+    failed = cleanup._expire_pdfs(["expired.pdf", "already-gone.pdf", "undeletable.pdf"])
+
+    assert failed == ["undeletable.pdf"]
+    assert os.listdir(tmp_path) == ["undeletable.pdf"]
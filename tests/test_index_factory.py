@@ -0,0 +1,33 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+
+from pdf_data_extraction.app import index_factory
+
+
+def random_vectors(count, dim=96, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_ivfpq_needs_a_training_point_per_centroid():
+    assert not index_factory._ivfpq_trainable(255)
+    assert index_factory._ivfpq_trainable(256)
+
+
+def test_small_partition_falls_back_to_flat():
+    vectors = random_vectors(100)
+    ids = np.arange(1000, 1100, dtype=np.int64)
+
+    index = index_factory.build_index(vectors, ids, "ivfpq")
+
+    assert isinstance(faiss.downcast_index(index.index), faiss.IndexFlatIP)
+    _, found = index.search(vectors[:1], 1)
+    assert found[0][0] == 1000
+
+
+def test_recall_at_k_works_on_small_samples():
+    vectors = random_vectors(50)
+
+    assert index_factory.recall_at_k(vectors, vectors[:5], k=5, backend="ivfpq") == 1.0
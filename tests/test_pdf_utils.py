@@ -0,0 +1,127 @@
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("tiktoken")
+
+from pdf_data_extraction.app import pdf_utils
+
+
+class CharEncoding:
+    """One token per character, so token counts and offsets are easy to reason about."""
+
+    def encode(self, text, disallowed_special=()):
+        return [ord(c) for c in text]
+
+    def decode(self, tokens):
+        return "".join(chr(t) for t in tokens)
+
+    def decode_with_offsets(self, tokens):
+        return self.decode(tokens), list(range(len(tokens)))
+
+
+class ByteEncoding(CharEncoding):
+    """One token per UTF-8 byte, with tiktoken's offset rule for continuation bytes."""
+
+    def encode(self, text, disallowed_special=()):
+        return list(text.encode("utf-8"))
+
+    def decode(self, tokens):
+        return bytes(tokens).decode("utf-8", errors="replace")
+
+    def decode_with_offsets(self, tokens):
+        offsets = []
+        text_len = 0
+        for token in tokens:
+            is_continuation = 0x80 <= token < 0xC0
+            offsets.append(max(0, text_len - is_continuation))
+            text_len += not is_continuation
+        return self.decode(tokens), offsets
+
+
+@pytest.fixture(autouse=True)
+def char_encoding(monkeypatch):
+    monkeypatch.setattr(pdf_utils, "_encoding", CharEncoding())
+
+
+def chunks_of(pages, **kwargs):
+    kwargs = {"max_tokens": 10, "overlap_tokens": 2, "min_tokens": 4, **kwargs}
+    return list(pdf_utils.iter_token_chunks(pages, **kwargs))
+
+
+@pytest.mark.parametrize("length", range(1, 61))
+def test_chunks_respect_max_tokens_and_cover_the_text(length):
+    text = "".join(chr(ord("a") + i % 26) for i in range(length))
+
+    chunks = chunks_of([text])
+
+    assert all(chunk["token_count"] <= 10 for chunk in chunks)
+    assert chunks[0]["char_start"] == 0
+    assert chunks[-1]["char_end"] == length
+    for previous, chunk in zip(chunks, chunks[1:]):
+        # Consecutive chunks share exactly overlap_tokens tokens
+        assert chunk["char_start"] == previous["char_end"] - 2
+    if length >= 4:
+        assert all(chunk["token_count"] >= 4 for chunk in chunks)
+    for chunk in chunks:
+        assert chunk["text"] == text[chunk["char_start"]:chunk["char_end"]]
+
+
+def test_exact_multiple_produces_no_tail_chunk():
+    chunks = chunks_of(["x" * 18])
+
+    assert [(c["char_start"], c["char_end"]) for c in chunks] == [(0, 10), (8, 18)]
+
+
+def test_short_tail_is_rebalanced_with_previous_chunk():
+    # 10 tokens, then a tail of 2 new tokens (< min_tokens)
+    chunks = chunks_of(["x" * 12])
+
+    assert [(c["char_start"], c["char_end"]) for c in chunks] == [(0, 7), (5, 12)]
+
+
+def test_chunks_span_pages_with_page_relative_offsets():
+    chunks = chunks_of(["abcdef", "ghijklmn"])
+
+    assert chunks[0]["page_start"] == 0
+    assert chunks[0]["page_end"] == 1
+    assert chunks[0]["text"] == "abcdefghij"
+    assert (chunks[0]["char_start"], chunks[0]["char_end"]) == (0, 4)
+
+
+def test_empty_pages_are_skipped():
+    chunks = chunks_of(["", "abc", ""])
+
+    assert len(chunks) == 1
+    assert chunks[0]["page_start"] == chunks[0]["page_end"] == 1
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"overlap_tokens": 10},
+    {"overlap_tokens": 5, "min_tokens": 6},
+])
+def test_invalid_settings_are_rejected(kwargs):
+    with pytest.raises(ValueError):
+        chunks_of(["x" * 20], **kwargs)
+
+
+def test_multibyte_characters_are_never_split(monkeypatch):
+    monkeypatch.setattr(pdf_utils, "_encoding", ByteEncoding())
+    page = "日本語のテキスト、ページ一"  # Three UTF-8 bytes per character
+
+    chunks = chunks_of([page], max_tokens=10, overlap_tokens=4, min_tokens=2)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert "\ufffd" not in chunk["text"]
+        assert chunk["text"] == page[chunk["char_start"]:chunk["char_end"]]
+    assert chunks[-1]["char_end"] == len(page)
+
+
+def test_chunk_text_across_pages_comes_from_the_page_text():
+    pages = ["abc", "", "defgh", "ijklmnopqrst"]
+
+    chunks = chunks_of(pages)
+
+    assert chunks[0]["text"] == "abcdefghij"
+    assert (chunks[0]["page_start"], chunks[0]["page_end"]) == (0, 3)
+    assert chunks[-1]["text"] == pages[3][chunks[-1]["char_start"]:chunks[-1]["char_end"]]
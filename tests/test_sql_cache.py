@@ -0,0 +1,53 @@
+import pytest
+
+for module in ("numpy", "openai", "dotenv", "pandas", "fastapi", "mysql.connector"):
+    pytest.importorskip(module)
+
+from nl2sql.services.sql_cache import normalize_question, _literals
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Top 5 customers?", "top 5   customers"),
+    ("Total sales in 2023.", "total sales in 2023"),
+])
+def test_trivial_differences_share_a_key(first, second):
+    assert normalize_question(first) == normalize_question(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("orders with total > 100", "orders with total < 100"),
+    ("products with rating >= 4", "products with rating = 4"),
+    ("products rated 3.5 stars", "products rated 35 stars"),
+    ("discounts of -5", "discounts of 5"),
+    ("orders above 1,000", "orders above 1000"),
+])
+def test_meaningful_differences_get_different_keys(first, second):
+    assert normalize_question(first) != normalize_question(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("sales in 2023", "sales in 2024"),
+    ("orders with total > 100", "orders with total < 100"),
+    ("rating above 3.5", "rating above 35"),
+])
+def test_semantic_tier_requires_matching_literals(first, second):
+    assert _literals(normalize_question(first)) != _literals(normalize_question(second))
+
+
+@pytest.mark.parametrize("first, second", [
+    ("orders in category 'Books'", "orders in category 'Electronics'"),
+    ('customers named "Smith"', 'customers named "Jones"'),
+    ("sales in January", "sales in March"),
+    ("sales in Jan", "sales in March"),
+])
+def test_semantic_tier_requires_matching_quoted_values_and_months(first, second):
+    assert _literals(normalize_question(first)) != _literals(normalize_question(second))
+
+
+@pytest.mark.parametrize("first, second", [
+    ("sales in Jan", "sales in January"),
+    ("customer's orders in 'Books'", "orders of each customer in 'Books'"),
+    ("what's the total revenue", "total revenue"),
+])
+def test_equivalent_literals_still_match(first, second):
+    assert _literals(normalize_question(first)) == _literals(normalize_question(second))
@@ -0,0 +1,46 @@
+import pytest
+
+for module in ("dotenv", "openai", "tiktoken", "fitz"):
+    pytest.importorskip(module)
+
+from summarizer import openai_utils
+
+
+class ByteEncoding:
+    """One token per UTF-8 byte, with tiktoken's offset rule for continuation bytes."""
+
+    def encode(self, text, disallowed_special=()):
+        return list(text.encode("utf-8"))
+
+    def decode(self, tokens):
+        return bytes(tokens).decode("utf-8", errors="replace")
+
+    def decode_with_offsets(self, tokens):
+        offsets = []
+        text_len = 0
+        for token in tokens:
+            is_continuation = 0x80 <= token < 0xC0
+            offsets.append(max(0, text_len - is_continuation))
+            text_len += not is_continuation
+        return self.decode(tokens), offsets
+
+
+@pytest.fixture(autouse=True)
+def byte_encoding(monkeypatch):
+    monkeypatch.setattr(openai_utils, "_encoding", ByteEncoding())
+
+
+def test_paragraphs_are_packed_up_to_the_budget():
+    chunks = openai_utils.split_text("aaaa\n\nbbbb\n\ncccc", max_tokens=10)
+
+    assert chunks == ["aaaa\n\nbbbb", "cccc"]
+
+
+def test_long_paragraph_is_split_without_breaking_characters():
+    paragraph = "日本語のテキスト" * 3  # Three UTF-8 bytes per character
+
+    chunks = openai_utils.split_text(paragraph, max_tokens=10)
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == paragraph
+    assert all("\ufffd" not in chunk for chunk in chunks)